@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Compare the standard and performance runtime profiles
+
+    python benchmark.py
+    python benchmark.py --updates 50000 --batch 100
+    python benchmark.py --profile performance
+
+Each profile runs in a fresh process against a local fake Bot API, no token
+or database is needed. The bot polls getUpdates, decodes the updates, runs
+them through the same update processor as main.py and answers each one with
+sendMessage through the shared HTTP transport. A new batch is served once the
+previous one is answered; latency is the time from the fake API serving an
+update to receiving its answer.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from urllib.parse import parse_qsl
+
+TOKEN = '123456:benchmark'
+
+def make_update(update_id: int) -> dict:
+    user_id = 1000 + update_id % 5000
+    return {
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id,
+            'date': int(time.time()),
+            'from': {'id': user_id, 'is_bot': False, 'first_name': 'Bench', 'username': f'user{user_id}'},
+            'chat': {'id': user_id, 'type': 'private', 'first_name': 'Bench'},
+            'text': 'hola rias, ¿cómo estás?',
+        }
+    }
+
+class BotAPIServer:
+    """Minimal HTTP/1.1 server speaking the Bot API, answer() builds each response"""
+
+    async def answer(self, method: str, params: dict) -> bytes:
+        raise NotImplementedError
+
+    @staticmethod
+    def ok(result) -> bytes:
+        return json.dumps({'ok': True, 'result': result}).encode()
+
+    @staticmethod
+    def message(message_id: int, chat_id: int) -> dict:
+        return {'message_id': message_id, 'date': int(time.time()), 'chat': {'id': chat_id, 'type': 'private'}, 'text': 'ok'}
+
+    async def start(self) -> int:
+        """Listen on a free local port and return it"""
+        self.server = await asyncio.start_server(self.handle, '127.0.0.1', 0)
+        return self.server.sockets[0].getsockname()[1]
+
+    def close(self):
+        self.server.close()
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                lines = head.decode('latin-1').split("\r\n")
+                path = lines[0].split(' ')[1]
+                length = 0
+                for line in lines[1:]:
+                    if line.lower().startswith('content-length:'):
+                        length = int(line.split(':', 1)[1])
+                body = await reader.readexactly(length) if length else b''
+                params = dict(parse_qsl(body.decode('utf-8', 'replace')))
+                payload = await self.answer(path.rsplit('/', 1)[-1], params)
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    b"Content-Length: %d\r\n\r\n" % len(payload) + payload
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+class FakeBotAPI(BotAPIServer):
+    """Serves pre-built batches of updates and times the answers"""
+
+    def __init__(self, total: int, batch: int):
+        self.total = total
+        self.batch = batch
+        # Pre-encoded so the server costs the same with both profiles
+        self.batches = [
+            self.ok([make_update(i) for i in range(start, min(start + batch, total + 1))])
+            for start in range(1, total + 1, batch)
+        ]
+        self.next_batch = 0
+        self.served_at = []
+        self.latencies = []
+        self.done = asyncio.Event()
+
+    async def answer(self, method: str, params: dict) -> bytes:
+        if method == 'getMe':
+            return self.ok({'id': 123456, 'is_bot': True, 'first_name': 'Bench', 'username': 'bench_bot'})
+        if method == 'getUpdates':
+            # Serve the next batch once the previous one is answered, so latency
+            # measures the bot and not a backlog the fake API piled up
+            while len(self.latencies) < (self.next_batch * self.batch) and not self.done.is_set():
+                await asyncio.sleep(0.001)
+            if self.next_batch >= len(self.batches):
+                # Like the real long poll, do not spin when there is nothing new
+                await asyncio.sleep(0.05)
+                return self.ok([])
+            payload = self.batches[self.next_batch]
+            self.served_at.append(time.perf_counter())
+            self.next_batch += 1
+            return payload
+        if method == 'sendMessage':
+            # reply_to_message_id is the update id, see reply() below
+            message_id = int(params.get('reply_to_message_id', 0))
+            if message_id:
+                self.latencies.append(time.perf_counter() - self.served_at[(message_id - 1) // self.batch])
+                if len(self.latencies) >= self.total:
+                    self.done.set()
+            return self.ok(self.message(message_id, 1))
+        return self.ok(True)
+
+async def reply(update, context):
+    # The answer carries the update id so the fake API can match it
+    await context.bot.send_message(update.effective_chat.id, "ok", reply_to_message_id=update.update_id)
+
+async def run_profile(updates: int, batch: int) -> dict:
+    from telegram.ext import Application, MessageHandler, filters
+    from utils.http import create_shared_request, create_updates_request
+    from utils.runtime import runtime
+    from utils.intake import IntakeProcessor
+    from utils.watchdog import loop_watchdog
+
+    api = FakeBotAPI(updates, batch)
+    port = await api.start()
+
+    application = (
+        Application.builder().token(TOKEN)
+        .base_url(f"http://127.0.0.1:{port}/bot")
+        .request(create_shared_request())
+        .get_updates_request(create_updates_request())
+        .concurrent_updates(IntakeProcessor(loop_watchdog))
+        .build()
+    )
+    application.add_handler(MessageHandler(filters.TEXT, reply))
+
+    await application.initialize()
+    await application.start()
+    started = time.perf_counter()
+    await application.updater.start_polling(poll_interval=0, timeout=0)
+    await api.done.wait()
+    elapsed = time.perf_counter() - started
+    await application.updater.stop()
+    await application.stop()
+    await application.shutdown()
+    api.close()
+
+    latencies = sorted(api.latencies)
+    return {
+        'profile': runtime.describe(),
+        'updates': len(latencies),
+        'updates_per_second': len(latencies) / elapsed,
+        'p50_ms': latencies[len(latencies) // 2] * 1000,
+        'p99_ms': latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        'max_ms': latencies[-1] * 1000,
+    }
+
+def run_single(args):
+    from utils.runtime import runtime
+    runtime.apply(args.profile)
+    result = asyncio.run(run_profile(args.updates, args.batch))
+    if args.json:
+        print(json.dumps(result))
+    else:
+        print_results([result])
+
+def print_results(results: list):
+    print(f"{'Perfil':<48} {'updates/s':>10} {'p50 ms':>8} {'p99 ms':>8} {'máx ms':>8}")
+    for result in results:
+        print(f"{result['profile']:<48} {result['updates_per_second']:>10.0f} "
+              f"{result['p50_ms']:>8.1f} {result['p99_ms']:>8.1f} {result['max_ms']:>8.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Comparar los perfiles de ejecución standard y performance")
+    parser.add_argument('--profile', choices=['standard', 'performance'], help="Ejecutar solo este perfil")
+    parser.add_argument('--updates', type=int, default=20000, help="Actualizaciones por perfil (por defecto 20000)")
+    parser.add_argument('--batch', type=int, default=100, help="Actualizaciones por getUpdates (por defecto 100)")
+    parser.add_argument('--json', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.profile:
+        run_single(args)
+        return
+
+    results = []
+    for profile in ('standard', 'performance'):
+        print(f"⏳ Ejecutando perfil {profile} con {args.updates} actualizaciones...")
+        # A fresh interpreter per profile, the event loop policy is process wide
+        output = subprocess.run(
+            [sys.executable, __file__, '--profile', profile, '--updates', str(args.updates),
+             '--batch', str(args.batch), '--json'],
+            capture_output=True, text=True, check=True, env={**os.environ, 'RUNTIME_PROFILE': profile}
+        )
+        results.append(json.loads(output.stdout.strip().splitlines()[-1]))
+    print()
+    print_results(results)
+    standard, performance = results
+    print(f"\nperformance / standard: {performance['updates_per_second'] / standard['updates_per_second']:.2f}x updates/s, "
+          f"p99 {performance['p99_ms'] / standard['p99_ms']:.2f}x")
+
+if __name__ == '__main__':
+    main()
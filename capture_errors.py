@@ -4,6 +4,7 @@ Error capture script that saves all errors to a file for GitHub
 This will capture everything and save it automatically
 """
 
+import atexit
 import os
 import sys
 import traceback
@@ -44,22 +45,33 @@ def capture_console_output():
     original_stdout = sys.stdout
     original_stderr = sys.stderr
     
+    # One handle for both streams, closed when the process exits
+    log_file = open('github_errors.txt', 'a', encoding='utf-8')
+    
     class TeeOutput:
         def __init__(self, original_stream):
             self.original_stream = original_stream
-            self.log_file = open('github_errors.txt', 'a', encoding='utf-8')
+            self.log_file = log_file
         
         def write(self, text):
             self.original_stream.write(text)
-            self.log_file.write(text)
-            self.log_file.flush()
+            if not self.log_file.closed:
+                self.log_file.write(text)
+                self.log_file.flush()
         
         def flush(self):
             self.original_stream.flush()
-            self.log_file.flush()
+            if not self.log_file.closed:
+                self.log_file.flush()
+    
+    def restore():
+        sys.stdout = original_stdout
+        sys.stderr = original_stderr
+        log_file.close()
     
     sys.stdout = TeeOutput(original_stdout)
     sys.stderr = TeeOutput(original_stderr)
+    atexit.register(restore)
 
 def main():
     """Main function to capture all errors"""
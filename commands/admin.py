@@ -1,9 +1,66 @@
 from telegram import Update
 from telegram.ext import ContextTypes
 from database.database import DatabaseManager
+from database.models import Rank
 
 db_manager = DatabaseManager()
 
+DEFAULT_DAYS = 30
+# Ten years, a bigger number after a reply is a Telegram ID, not a duration
+MAX_DAYS = 3650
+
+def is_days(arg: str) -> bool:
+    return arg.lstrip('-').isdigit() and int(arg) <= MAX_DAYS
+
+async def resolve_target(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Target of a grant command and the remaining args
+    
+    The target is an @username, a numeric ID or, when neither is given, the
+    author of the replied message. When replying, a single number up to MAX_DAYS
+    is the days and a bigger one an ID. Returns (None, None) after answering the
+    user when it cannot be resolved.
+    """
+    args = list(context.args or [])
+    reply = update.message.reply_to_message
+    # In forum topics every message replies to the topic creation message
+    replied = reply.from_user if reply and not reply.forum_topic_created else None
+    if replied and not replied.is_bot and (not args or (len(args) == 1 and is_days(args[0]))):
+        # Replying to the user, the only arg is the days
+        return replied.id, args
+    
+    if not args:
+        await update.message.reply_text("❌ *Error: Indica un ID, un @usuario o responde a un mensaje del usuario*", parse_mode='Markdown')
+        return None, None
+    
+    target = args[0]
+    if target.startswith('@'):
+        target_id = await db_manager.resolve_username(target)
+        if target_id is None:
+            await update.message.reply_text(
+                f"❌ *Error: No conozco a* `{target}`\n\n"
+                f"El usuario debe haber escrito al bot, o usa su ID o responde a uno de sus mensajes",
+                parse_mode='Markdown'
+            )
+            return None, None
+        return target_id, args[1:]
+    
+    try:
+        return int(target), args[1:]
+    except ValueError:
+        await update.message.reply_text("❌ *Error: ID de usuario inválido*", parse_mode='Markdown')
+        return None, None
+
+async def parse_days(update: Update, args: list):
+    """Days of a grant, None after answering the user when invalid"""
+    try:
+        days = int(args[0]) if args else DEFAULT_DAYS
+    except ValueError:
+        days = None
+    if days is None or not 1 <= days <= MAX_DAYS:
+        await update.message.reply_text(f"❌ *Error: Número de días inválido, debe estar entre 1 y {MAX_DAYS}*", parse_mode='Markdown')
+        return None
+    return days
+
 class AdminCommands:
     @staticmethod
     async def add_admin(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -12,37 +69,38 @@ class AdminCommands:
         
         # Check if user is Issei
         user_data = await db_manager.get_user(user.id)
-        if not user_data or user_data['rank'] != 'issei':
+        if not user_data or user_data.rank != Rank.ISSEI:
             await update.message.reply_text("❌ *Error: Solo Issei puede agregar administradores*", parse_mode='Markdown')
             return
         
-        # Check if user ID is provided
-        if not context.args:
-            await update.message.reply_text("❌ *Uso:* /addadmin <user_id>", parse_mode='Markdown')
+        # Check if a target is provided
+        if not context.args and not update.message.reply_to_message:
+            await update.message.reply_text("❌ *Uso:* `/addadmin <user_id|@usuario> [días]` o responde a un mensaje del usuario", parse_mode='Markdown')
+            return
+        
+        target_id, args = await resolve_target(update, context)
+        if target_id is None:
+            return
+        
+        days = await parse_days(update, args)
+        if days is None:
             return
         
-        try:
-            target_id = int(context.args[0])
-            days = int(context.args[1]) if len(context.args) > 1 else 30
-            
-            # Update user rank
-            updated_user = await db_manager.update_user_rank(target_id, 'admin', days)
-            
-            if updated_user:
-                await update.message.reply_text(
-                    f"✅ *¡Administrador agregado exitosamente!*\n\n"
-                    f"👤 *Usuario:* {updated_user['first_name']}\n"
-                    f"🆔 *ID:* `{target_id}`\n"
-                    f"⚡ *Rango:* Admin\n"
-                    f"⏰ *Duración:* {days} días\n\n"
-                    f"🎭 *¡El poder de Rias Gremory está contigo!* 🎭",
-                    parse_mode='Markdown'
-                )
-            else:
-                await update.message.reply_text("❌ *Error: Usuario no encontrado*", parse_mode='Markdown')
-                
-        except ValueError:
-            await update.message.reply_text("❌ *Error: ID de usuario inválido*", parse_mode='Markdown')
+        # Update user rank
+        updated_user = await db_manager.update_user_rank(target_id, Rank.ADMIN, days, actor_id=user.id)
+        
+        if updated_user:
+            await update.message.reply_text(
+                f"✅ *¡Administrador agregado exitosamente!*\n\n"
+                f"👤 *Usuario:* {updated_user.first_name}\n"
+                f"🆔 *ID:* `{target_id}`\n"
+                f"⚡ *Rango:* Admin\n"
+                f"⏰ *Duración:* {days} días\n\n"
+                f"🎭 *¡El poder de Rias Gremory está contigo!* 🎭",
+                parse_mode='Markdown'
+            )
+        else:
+            await update.message.reply_text("❌ *Error: Usuario no encontrado*", parse_mode='Markdown')
     
     @staticmethod
     async def add_seller(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -51,37 +109,38 @@ class AdminCommands:
         
         # Check if user has permission
         user_data = await db_manager.get_user(user.id)
-        if not user_data or user_data['rank'] not in ['issei', 'admin']:
+        if not user_data or user_data.rank not in [Rank.ISSEI, Rank.ADMIN]:
             await update.message.reply_text("❌ *Error: Solo Issei y Administradores pueden agregar vendedores*", parse_mode='Markdown')
             return
         
-        # Check if user ID is provided
-        if not context.args:
-            await update.message.reply_text("❌ *Uso:* /addseller <user_id> [días]", parse_mode='Markdown')
+        # Check if a target is provided
+        if not context.args and not update.message.reply_to_message:
+            await update.message.reply_text("❌ *Uso:* `/addseller <user_id|@usuario> [días]` o responde a un mensaje del usuario", parse_mode='Markdown')
+            return
+        
+        target_id, args = await resolve_target(update, context)
+        if target_id is None:
             return
         
-        try:
-            target_id = int(context.args[0])
-            days = int(context.args[1]) if len(context.args) > 1 else 30
-            
-            # Update user rank
-            updated_user = await db_manager.update_user_rank(target_id, 'seller', days)
-            
-            if updated_user:
-                await update.message.reply_text(
-                    f"✅ *¡Vendedor agregado exitosamente!*\n\n"
-                    f"👤 *Usuario:* {updated_user['first_name']}\n"
-                    f"🆔 *ID:* `{target_id}`\n"
-                    f"💎 *Rango:* Seller\n"
-                    f"⏰ *Duración:* {days} días\n\n"
-                    f"💎 *¡El comercio de Rias Gremory está en tus manos!* 💎",
-                    parse_mode='Markdown'
-                )
-            else:
-                await update.message.reply_text("❌ *Error: Usuario no encontrado*", parse_mode='Markdown')
-                
-        except ValueError:
-            await update.message.reply_text("❌ *Error: ID de usuario inválido*", parse_mode='Markdown')
+        days = await parse_days(update, args)
+        if days is None:
+            return
+        
+        # Update user rank
+        updated_user = await db_manager.update_user_rank(target_id, Rank.SELLER, days, actor_id=user.id)
+        
+        if updated_user:
+            await update.message.reply_text(
+                f"✅ *¡Vendedor agregado exitosamente!*\n\n"
+                f"👤 *Usuario:* {updated_user.first_name}\n"
+                f"🆔 *ID:* `{target_id}`\n"
+                f"💎 *Rango:* Seller\n"
+                f"⏰ *Duración:* {days} días\n\n"
+                f"💎 *¡El comercio de Rias Gremory está en tus manos!* 💎",
+                parse_mode='Markdown'
+            )
+        else:
+            await update.message.reply_text("❌ *Error: Usuario no encontrado*", parse_mode='Markdown')
     
     @staticmethod
     async def add_premium(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -90,37 +149,38 @@ class AdminCommands:
         
         # Check if user has permission
         user_data = await db_manager.get_user(user.id)
-        if not user_data or user_data['rank'] not in ['issei', 'admin', 'seller']:
+        if not user_data or user_data.rank not in [Rank.ISSEI, Rank.ADMIN, Rank.SELLER]:
             await update.message.reply_text("❌ *Error: Solo Issei, Administradores y Vendedores pueden agregar usuarios premium*", parse_mode='Markdown')
             return
         
-        # Check if user ID is provided
-        if not context.args:
-            await update.message.reply_text("❌ *Uso:* /addpremium <user_id> [días]", parse_mode='Markdown')
+        # Check if a target is provided
+        if not context.args and not update.message.reply_to_message:
+            await update.message.reply_text("❌ *Uso:* `/addpremium <user_id|@usuario> [días]` o responde a un mensaje del usuario", parse_mode='Markdown')
             return
         
-        try:
-            target_id = int(context.args[0])
-            days = int(context.args[1]) if len(context.args) > 1 else 30
-            
-            # Update user rank
-            updated_user = await db_manager.update_user_rank(target_id, 'premium', days)
-            
-            if updated_user:
-                await update.message.reply_text(
-                    f"✅ *¡Usuario Premium agregado exitosamente!*\n\n"
-                    f"👤 *Usuario:* {updated_user['first_name']}\n"
-                    f"🆔 *ID:* `{target_id}`\n"
-                    f"🌟 *Rango:* Premium\n"
-                    f"⏰ *Duración:* {days} días\n\n"
-                    f"🌟 *¡Bienvenido al club exclusivo de Rias Gremory!* 🌟",
-                    parse_mode='Markdown'
-                )
-            else:
-                await update.message.reply_text("❌ *Error: Usuario no encontrado*", parse_mode='Markdown')
-                
-        except ValueError:
-            await update.message.reply_text("❌ *Error: ID de usuario inválido*", parse_mode='Markdown')
+        target_id, args = await resolve_target(update, context)
+        if target_id is None:
+            return
+        
+        days = await parse_days(update, args)
+        if days is None:
+            return
+        
+        # Update user rank
+        updated_user = await db_manager.update_user_rank(target_id, Rank.PREMIUM, days, actor_id=user.id)
+        
+        if updated_user:
+            await update.message.reply_text(
+                f"✅ *¡Usuario Premium agregado exitosamente!*\n\n"
+                f"👤 *Usuario:* {updated_user.first_name}\n"
+                f"🆔 *ID:* `{target_id}`\n"
+                f"🌟 *Rango:* Premium\n"
+                f"⏰ *Duración:* {days} días\n\n"
+                f"🌟 *¡Bienvenido al club exclusivo de Rias Gremory!* 🌟",
+                parse_mode='Markdown'
+            )
+        else:
+            await update.message.reply_text("❌ *Error: Usuario no encontrado*", parse_mode='Markdown')
 
 # Create instance for import
 admin_commands = AdminCommands()
\ No newline at end of file
@@ -0,0 +1,78 @@
+from telegram import Update
+from telegram.ext import ContextTypes
+from database.database import DatabaseManager
+from database.models import Rank, RANKS
+from database.tenant import TenantLocal
+from utils.broadcast import BroadcastEngine
+
+db_manager = DatabaseManager()
+# Each bot sends its own broadcasts to its own users
+broadcast_engine = TenantLocal(lambda tenant: BroadcastEngine(db_manager))
+
+async def broadcast_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /broadcast command - Only Issei and Admin can broadcast"""
+    user = update.effective_user
+
+    # Check if user has permission
+    rank = await db_manager.get_user_rank(user.id)
+    if rank not in [Rank.ISSEI, Rank.ADMIN]:
+        await update.message.reply_text("❌ *Error: Solo Issei y Administradores pueden enviar difusiones*", parse_mode='Markdown')
+        return
+
+    usage = (
+        "❌ *Uso:*\n"
+        "`/broadcast <all|premium|seller|admin|free_user> <mensaje>`\n"
+        "`/broadcast status`\n"
+        "`/broadcast cancel <id>`"
+    )
+    if not context.args:
+        await update.message.reply_text(usage, parse_mode='Markdown')
+        return
+
+    action = context.args[0].lower()
+
+    if action == 'status':
+        if not broadcast_engine.jobs:
+            await update.message.reply_text("📢 *No hay difusiones en curso*", parse_mode='Markdown')
+            return
+        lines = ["📢 *Difusiones en curso*\n"]
+        for job in broadcast_engine.jobs.values():
+            lines.append(
+                f"• *#{job.broadcast_id}* `{job.target_rank or 'all'}`: "
+                f"✅ {job.sent} 🚫 {job.blocked} ❌ {job.failed}"
+            )
+        await update.message.reply_text("\n".join(lines), parse_mode='Markdown')
+        return
+
+    if action == 'cancel':
+        try:
+            broadcast_id = int(context.args[1])
+        except (IndexError, ValueError):
+            await update.message.reply_text(usage, parse_mode='Markdown')
+            return
+        if await broadcast_engine.cancel(broadcast_id):
+            await update.message.reply_text(f"🛑 *Difusión #{broadcast_id} cancelada*", parse_mode='Markdown')
+        else:
+            await update.message.reply_text(f"❌ *Error: La difusión #{broadcast_id} no está en curso*", parse_mode='Markdown')
+        return
+
+    if action != 'all' and action not in RANKS:
+        await update.message.reply_text(usage, parse_mode='Markdown')
+        return
+
+    # Keep the original formatting (line breaks) of the message
+    parts = update.message.text.split(None, 2)
+    if len(parts) < 3:
+        await update.message.reply_text(usage, parse_mode='Markdown')
+        return
+    text = parts[2]
+
+    target_rank = None if action == 'all' else Rank(action)
+    broadcast_id = await broadcast_engine.create(context.bot, user.id, target_rank, text)
+
+    await update.message.reply_text(
+        f"📢 *Difusión #{broadcast_id} iniciada*\n\n"
+        f"🎯 *Destino:* `{action}`\n"
+        f"📊 Usa `/broadcast status` para ver el progreso",
+        parse_mode='Markdown'
+    )
@@ -2,13 +2,14 @@ import subprocess
 import os
 from telegram import Update
 from telegram.ext import ContextTypes
+from database.models import OWNER_ID
 
 async def commit_logs_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /commitlogs command - Only Issei can commit logs"""
     user = update.effective_user
     
     # Check if user is Issei
-    if user.id != 7560671542:
+    if user.id != OWNER_ID:
         await update.message.reply_text("❌ *Error: Solo Issei puede hacer commit de los logs*", parse_mode='Markdown')
         return
     
@@ -0,0 +1,73 @@
+import asyncio
+import logging
+import os
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from telegram import Update
+from telegram.ext import ContextTypes
+from database.database import DatabaseManager
+from database.transfer import export_users
+from database.models import OWNER_ID
+
+logger = logging.getLogger('RiasBot')
+
+db_manager = DatabaseManager()
+
+# Export running in the background, one at a time
+export_task = None
+
+# Bots can upload documents up to 50 MB
+MAX_DOCUMENT_SIZE = 50 * 1024 * 1024
+
+async def export_users_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /exportusers command - Only Issei can export the users table"""
+    user = update.effective_user
+
+    # Check if user is Issei
+    if user.id != OWNER_ID:
+        await update.message.reply_text("❌ *Error: Solo Issei puede exportar los usuarios*", parse_mode='Markdown')
+        return
+
+    fmt = context.args[0].lower() if context.args else 'csv'
+    if fmt not in ['csv', 'jsonl']:
+        await update.message.reply_text("❌ *Uso:* `/exportusers [csv|jsonl]`", parse_mode='Markdown')
+        return
+
+    global export_task
+    if export_task is not None and not export_task.done():
+        await update.message.reply_text("⏳ *Ya hay una exportación en curso*", parse_mode='Markdown')
+        return
+
+    # Updates are handled one at a time, export in the background so nobody waits for it
+    export_task = asyncio.create_task(send_export(update, fmt))
+    await update.message.reply_text("⏳ *Exportando usuarios...*\n\nTe enviaré el archivo al terminar", parse_mode='Markdown')
+
+async def send_export(update: Update, fmt: str):
+    """Export the users table and send it to the chat of the command"""
+    filename = f"users_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{fmt}.gz"
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, filename)
+            count = await export_users(db_manager, path, fmt=fmt)
+
+            if os.path.getsize(path) > MAX_DOCUMENT_SIZE:
+                await update.message.reply_text(
+                    f"❌ *El archivo supera 50 MB* ({count} usuarios)\n\n"
+                    f"Usa `python manage_users.py export {filename}` en el servidor",
+                    parse_mode='Markdown'
+                )
+                return
+
+            await update.message.reply_document(
+                document=Path(path),
+                filename=filename,
+                caption=f"📤 *{count} usuarios exportados*",
+                parse_mode='Markdown'
+            )
+    except Exception as e:
+        logger.error(f"User export failed: {e}")
+        try:
+            await update.message.reply_text("❌ *Error: No se pudo exportar los usuarios*", parse_mode='Markdown')
+        except Exception:
+            pass
@@ -0,0 +1,60 @@
+from telegram import Update
+from telegram.ext import ContextTypes
+from database.database import DatabaseManager
+from database.models import Rank
+from database.audit import audit_log
+
+db_manager = DatabaseManager()
+
+SOURCE_NAMES = {
+    'grant': 'Asignado',
+    'key': 'Llave',
+    'expiry': 'Expiración',
+}
+
+async def history_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /history command - Only Issei and Admin can view rank history"""
+    user = update.effective_user
+
+    # Check if user has permission
+    rank = await db_manager.get_user_rank(user.id)
+    if rank not in [Rank.ISSEI, Rank.ADMIN]:
+        await update.message.reply_text("❌ *Error: Solo Issei y Administradores pueden ver el historial*", parse_mode='Markdown')
+        return
+
+    args = context.args or []
+    by_actor = bool(args) and args[0].lower() == 'by'
+    if by_actor:
+        args = args[1:]
+
+    if not args:
+        await update.message.reply_text("❌ *Uso:* `/history <user_id>` o `/history by <user_id>`", parse_mode='Markdown')
+        return
+
+    try:
+        telegram_id = int(args[0])
+    except ValueError:
+        await update.message.reply_text("❌ *Error: ID de usuario inválido*", parse_mode='Markdown')
+        return
+
+    # Make sure recent grants are written before reading them back
+    await audit_log.flush()
+    rows = await db_manager.get_rank_history(telegram_id, by_actor=by_actor)
+
+    if not rows:
+        await update.message.reply_text("📜 *No hay cambios de rango registrados*", parse_mode='Markdown')
+        return
+
+    title = "otorgados por" if by_actor else "de"
+    lines = [f"📜 *Historial de rangos {title}* `{telegram_id}`\n"]
+    for actor_id, target_id, old_rank, new_rank, days, source, created_at in rows:
+        old_info = await db_manager.get_rank_info(old_rank)
+        new_info = await db_manager.get_rank_info(new_rank)
+        days_text = f" ({days} días)" if days else ""
+        who = f"`{target_id}`" if by_actor else (f"por `{actor_id}`" if actor_id else "automático")
+        lines.append(
+            f"• {created_at.strftime('%d/%m/%Y %H:%M')} - {old_info['emoji']} → {new_info['emoji']} "
+            f"{new_info['name']}{days_text} {who} [{SOURCE_NAMES.get(source, source)}]"
+        )
+
+    await update.message.reply_text("\n".join(lines), parse_mode='Markdown')
@@ -21,16 +21,17 @@ async def info_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     colombia_time = datetime.now(colombia_tz)
     
     # Get rank info
-    rank_info = await db_manager.get_rank_info(user_data['rank'])
+    rank_info = await db_manager.get_rank_info(user_data.rank)
     
     # Calculate time remaining if user has expiration
     time_remaining = ""
-    if user_data['expires_at']:
-        expires_at = user_data['expires_at']
+    if user_data.expires_at:
+        expires_at = user_data.expires_at
         if isinstance(expires_at, str):
             expires_at = datetime.fromisoformat(expires_at.replace('Z', '+00:00'))
         
-        time_diff = expires_at - colombia_time
+        # Stored dates are naive local time
+        time_diff = expires_at - datetime.now(expires_at.tzinfo)
         if time_diff.total_seconds() > 0:
             days = time_diff.days
             hours = time_diff.seconds // 3600
@@ -63,13 +64,13 @@ async def info_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 • {time_remaining}
 
 📅 *Información de Cuenta:*
-• *Fecha de registro:* {user_data['created_at'].strftime('%d/%m/%Y %H:%M')}
+• *Fecha de registro:* {user_data.created_at.strftime('%d/%m/%Y %H:%M')}
 • *Última actualización:* {colombia_time.strftime('%d/%m/%Y %H:%M')}
 
 🇨🇴 *Hora en Colombia:* {colombia_time.strftime('%H:%M:%S')}
 
 🔥 *Comandos disponibles según tu rango:*
-{get_available_commands(user_data['rank'])}
+{get_available_commands(user_data.rank)}
 
 💫 *¡Gracias por usar el Bot de Rias Gremory!* 💫
     """
@@ -84,26 +85,42 @@ def get_available_commands(rank: str) -> str:
 • /info - Ver información
 • /addadmin - Agregar admin
 • /addseller - Agregar seller
-• /addpremium - Agregar premium""",
+• /addpremium - Agregar premium
+• /stats - Ver estadísticas
+• /users - Listar usuarios por rango
+• /broadcast - Enviar difusión
+• /history - Ver historial de rangos
+• /generatekey - Generar llaves
+• /keys - Ver llaves disponibles""",
         
         'admin': """
 • /start - Iniciar bot
 • /info - Ver información
 • /addseller - Agregar seller
-• /addpremium - Agregar premium""",
+• /addpremium - Agregar premium
+• /stats - Ver estadísticas
+• /users - Listar usuarios por rango
+• /broadcast - Enviar difusión
+• /history - Ver historial de rangos
+• /generatekey - Generar llaves
+• /keys - Ver llaves disponibles""",
         
         'seller': """
 • /start - Iniciar bot
 • /info - Ver información
-• /addpremium - Agregar premium""",
+• /addpremium - Agregar premium
+• /generatekey - Generar llaves
+• /keys - Ver llaves disponibles""",
         
         'premium': """
 • /start - Iniciar bot
-• /info - Ver información""",
+• /info - Ver información
+• /redeemkey - Canjear llave""",
         
         'free_user': """
 • /start - Iniciar bot
-• /info - Ver información"""
+• /info - Ver información
+• /redeemkey - Canjear llave"""
     }
     
     return commands.get(rank, commands['free_user'])
\ No newline at end of file
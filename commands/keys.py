@@ -0,0 +1,176 @@
+import io
+import os
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.ext import ContextTypes
+from database.database import DatabaseManager
+from database.models import Rank
+
+db_manager = DatabaseManager()
+
+PAGE_SIZE = int(os.getenv('KEYS_PAGE_SIZE', '10'))
+MAX_KEYS_PER_REQUEST = int(os.getenv('KEYS_MAX_PER_REQUEST', '5000'))
+# Above this amount the codes are sent as a file instead of a message
+KEYS_INLINE_LIMIT = 20
+
+# Ranks each rank is allowed to generate keys for
+GENERATABLE_RANKS = {
+    Rank.ISSEI: [Rank.ADMIN, Rank.SELLER, Rank.PREMIUM],
+    Rank.ADMIN: [Rank.SELLER, Rank.PREMIUM],
+    Rank.SELLER: [Rank.PREMIUM],
+}
+
+async def generate_key_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /generatekey command - Issei, Admin and Seller can generate keys"""
+    user = update.effective_user
+
+    # Check if user has permission
+    rank = await db_manager.get_user_rank(user.id)
+    if rank not in GENERATABLE_RANKS:
+        await update.message.reply_text("❌ *Error: Solo Issei, Administradores y Vendedores pueden generar llaves*", parse_mode='Markdown')
+        return
+
+    if len(context.args) < 2:
+        await update.message.reply_text("❌ *Uso:* /generatekey <rango> <días> [cantidad]", parse_mode='Markdown')
+        return
+
+    key_rank = context.args[0].lower()
+    if key_rank not in GENERATABLE_RANKS[rank]:
+        await update.message.reply_text(
+            f"❌ *Error: Solo puedes generar llaves de:* {', '.join(GENERATABLE_RANKS[rank])}",
+            parse_mode='Markdown'
+        )
+        return
+    key_rank = Rank(key_rank)
+
+    try:
+        days = int(context.args[1])
+        count = int(context.args[2]) if len(context.args) > 2 else 1
+    except ValueError:
+        await update.message.reply_text("❌ *Error: Días o cantidad inválidos*", parse_mode='Markdown')
+        return
+
+    if days <= 0 or not 1 <= count <= MAX_KEYS_PER_REQUEST:
+        await update.message.reply_text(
+            f"❌ *Error: Los días deben ser positivos y la cantidad entre 1 y {MAX_KEYS_PER_REQUEST}*",
+            parse_mode='Markdown'
+        )
+        return
+
+    codes = await db_manager.create_keys(user.id, key_rank, days, count)
+    rank_info = await db_manager.get_rank_info(key_rank)
+
+    if len(codes) <= KEYS_INLINE_LIMIT:
+        code_lines = "\n".join(f"`{code}`" for code in codes)
+        await update.message.reply_text(
+            f"🔑 *¡Llaves generadas exitosamente!*\n\n"
+            f"{rank_info['emoji']} *Rango:* {rank_info['name']}\n"
+            f"⏰ *Duración:* {days} días\n"
+            f"📦 *Cantidad:* {len(codes)}\n\n"
+            f"{code_lines}",
+            parse_mode='Markdown'
+        )
+    else:
+        document = io.BytesIO("\n".join(codes).encode('utf-8'))
+        await update.message.reply_document(
+            document=document,
+            filename=f"keys_{key_rank}_{days}d_{len(codes)}.txt",
+            caption=f"🔑 *{len(codes)} llaves {rank_info['name']} de {days} días generadas*",
+            parse_mode='Markdown'
+        )
+
+async def render_keys_page(user_id: int, rank: Rank, after_id: int = None, before_id: int = None):
+    """Build the text and keyboard for one page of available keys"""
+    # Issei and Admin see every key, sellers only their own
+    created_by = None if rank in [Rank.ISSEI, Rank.ADMIN] else user_id
+    rows, has_more = await db_manager.list_available_keys(created_by, after_id=after_id, before_id=before_id, limit=PAGE_SIZE)
+
+    if not rows:
+        return "🔑 *No hay llaves disponibles*", None
+
+    lines = ["🔑 *Llaves disponibles*\n"]
+    for _, code, key_rank, days in rows:
+        rank_info = await db_manager.get_rank_info(key_rank)
+        lines.append(f"• `{code}` - {rank_info['emoji']} {rank_info['name']} ({days} días)")
+
+    if before_id is not None:
+        has_prev, has_next = has_more, True
+    else:
+        has_prev, has_next = after_id is not None, has_more
+
+    buttons = []
+    if has_prev:
+        buttons.append(InlineKeyboardButton("⬅️ Anterior", callback_data=f"keys:p:{rows[0][0]}"))
+    if has_next:
+        buttons.append(InlineKeyboardButton("Siguiente ➡️", callback_data=f"keys:n:{rows[-1][0]}"))
+
+    reply_markup = InlineKeyboardMarkup([buttons]) if buttons else None
+    return "\n".join(lines), reply_markup
+
+async def keys_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /keys command - Issei, Admin and Seller can list keys"""
+    user = update.effective_user
+
+    # Check if user has permission
+    rank = await db_manager.get_user_rank(user.id)
+    if rank not in GENERATABLE_RANKS:
+        await update.message.reply_text("❌ *Error: Solo Issei, Administradores y Vendedores pueden ver las llaves*", parse_mode='Markdown')
+        return
+
+    text, reply_markup = await render_keys_page(user.id, rank)
+    await update.message.reply_text(text, reply_markup=reply_markup, parse_mode='Markdown')
+
+async def keys_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle next/prev buttons of the /keys listing"""
+    query = update.callback_query
+
+    # Check if user has permission
+    rank = await db_manager.get_user_rank(query.from_user.id)
+    if rank not in GENERATABLE_RANKS:
+        await query.answer("❌ Sin permiso", show_alert=True)
+        return
+
+    await query.answer()
+
+    # callback_data: keys:<n|p>:<cursor id>
+    try:
+        _, direction, cursor_id = query.data.split(':')
+        cursor_id = int(cursor_id)
+    except ValueError:
+        return
+
+    if direction == 'p':
+        text, reply_markup = await render_keys_page(query.from_user.id, rank, before_id=cursor_id)
+    else:
+        text, reply_markup = await render_keys_page(query.from_user.id, rank, after_id=cursor_id)
+
+    await query.edit_message_text(text, reply_markup=reply_markup, parse_mode='Markdown')
+
+async def redeem_key_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /redeemkey command"""
+    user = update.effective_user
+
+    if not context.args:
+        await update.message.reply_text("❌ *Uso:* /redeemkey <código>", parse_mode='Markdown')
+        return
+
+    # Make sure the user exists before redeeming
+    await db_manager.create_user(user.id, user.username, user.first_name, user.last_name or "")
+
+    code = context.args[0].strip().upper()
+    status, key_rank, expires_at = await db_manager.redeem_key(user.id, code)
+
+    if status == 'ok':
+        rank_info = await db_manager.get_rank_info(key_rank)
+        await update.message.reply_text(
+            f"✅ *¡Llave canjeada exitosamente!*\n\n"
+            f"{rank_info['emoji']} *Rango:* {rank_info['name']}\n"
+            f"⏰ *Expira:* {expires_at.strftime('%d/%m/%Y %H:%M')}\n\n"
+            f"🎭 *¡Bienvenido al club exclusivo de Rias Gremory!* 🎭",
+            parse_mode='Markdown'
+        )
+    elif status == 'used':
+        await update.message.reply_text("❌ *Error: Esta llave ya fue canjeada*", parse_mode='Markdown')
+    elif status == 'lower_rank':
+        await update.message.reply_text("❌ *Error: Tu rango actual es superior al de esta llave*", parse_mode='Markdown')
+    else:
+        await update.message.reply_text("❌ *Error: Llave inválida*", parse_mode='Markdown')
@@ -1,13 +1,14 @@
 from telegram import Update
 from telegram.ext import ContextTypes
 from utils.logger import error_logger
+from database.models import OWNER_ID
 
 async def logs_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /logs command - Only Issei can view logs"""
     user = update.effective_user
     
     # Check if user is Issei
-    if user.id != 7560671542:
+    if user.id != OWNER_ID:
         await update.message.reply_text("❌ *Error: Solo Issei puede ver los logs*", parse_mode='Markdown')
         return
     
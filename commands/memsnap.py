@@ -0,0 +1,58 @@
+import io
+from datetime import datetime
+from telegram import Update
+from telegram.ext import ContextTypes
+from utils.memory import memory_watchdog
+from database.models import OWNER_ID
+
+async def memsnap_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /memsnap command - Only Issei can inspect the bot memory"""
+    user = update.effective_user
+
+    # Check if user is Issei
+    if user.id != OWNER_ID:
+        await update.message.reply_text("❌ *Error: Solo Issei puede ver la memoria del bot*", parse_mode='Markdown')
+        return
+
+    action = context.args[0].lower() if context.args else 'diff'
+    if action == 'start':
+        memory_watchdog.start_tracing()
+        await update.message.reply_text(
+            "🔍 *tracemalloc activado*\n\nUsa `/memsnap` para tomar una instantánea y de nuevo más tarde para ver qué creció",
+            parse_mode='Markdown'
+        )
+        return
+    if action == 'stop':
+        memory_watchdog.stop_tracing()
+        await update.message.reply_text("✅ *tracemalloc desactivado*", parse_mode='Markdown')
+        return
+    if action == 'status':
+        await update.message.reply_text(f"🧠 *Memoria*\n\n```\n{memory_watchdog.status()}\n```", parse_mode='Markdown')
+        return
+    if action != 'diff':
+        await update.message.reply_text("❌ *Uso:* `/memsnap [start|stop|status]`", parse_mode='Markdown')
+        return
+
+    if not memory_watchdog.tracing:
+        await update.message.reply_text(
+            "❌ *tracemalloc no está activo*\n\nActívalo con `/memsnap start`, ralentiza el bot mientras está activo",
+            parse_mode='Markdown'
+        )
+        return
+
+    wait = memory_watchdog.snapshot_wait()
+    if wait:
+        # Each snapshot stalls the bot for a moment
+        await update.message.reply_text(
+            f"⏳ *Espera {int(wait) + 1} segundos antes de tomar otra instantánea*", parse_mode='Markdown'
+        )
+        return
+
+    report = f"{memory_watchdog.status()}\n\n{await memory_watchdog.diff()}"
+    stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    await update.message.reply_document(
+        document=io.BytesIO(report.encode('utf-8')),
+        filename=f"memsnap_{stamp}.txt",
+        caption="🧠 *Instantánea de memoria*, comparada con la anterior",
+        parse_mode='Markdown'
+    )
@@ -0,0 +1,31 @@
+from datetime import datetime
+from telegram import Update
+from telegram.ext import ContextTypes
+from utils.metrics import metrics
+from utils.watchdog import loop_watchdog
+from database.models import OWNER_ID
+
+async def metrics_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /metrics command - Only Issei can view metrics"""
+    user = update.effective_user
+
+    # Check if user is Issei
+    if user.id != OWNER_ID:
+        await update.message.reply_text("❌ *Error: Solo Issei puede ver las métricas*", parse_mode='Markdown')
+        return
+
+    if context.args and context.args[0].lower() == 'stalls':
+        if not loop_watchdog.events:
+            await update.message.reply_text("✅ *No se han detectado bloqueos del bot*", parse_mode='Markdown')
+            return
+        # Most recent last, each with the stack that was blocking
+        for event in list(loop_watchdog.events)[-5:]:
+            at = datetime.fromtimestamp(event.at).strftime('%d/%m/%Y %H:%M:%S')
+            text = f"{at} - {event.describe()}\n\n{event.stack}"[-3900:]
+            await update.message.reply_text(f"🐢 *Bloqueo*\n\n```\n{text}\n```", parse_mode='Markdown')
+        return
+
+    text = metrics.render()
+    chunks = [text[i:i+3900] for i in range(0, len(text), 3900)]
+    for i, chunk in enumerate(chunks):
+        await update.message.reply_text(f"📈 *MÉTRICAS {i+1}/{len(chunks)}*\n\n```\n{chunk}\n```", parse_mode='Markdown')
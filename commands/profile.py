@@ -0,0 +1,62 @@
+import io
+import logging
+from datetime import datetime
+from telegram import Update
+from telegram.ext import ContextTypes
+from utils.profiler import profiler
+from database.models import OWNER_ID
+
+logger = logging.getLogger('RiasBot')
+
+DEFAULT_SECONDS = 30
+MAX_SECONDS = 300
+
+async def profile_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /profile command - Only Issei can profile the bot"""
+    user = update.effective_user
+
+    # Check if user is Issei
+    if user.id != OWNER_ID:
+        await update.message.reply_text("❌ *Error: Solo Issei puede perfilar el bot*", parse_mode='Markdown')
+        return
+
+    try:
+        seconds = int(context.args[0]) if context.args else DEFAULT_SECONDS
+    except ValueError:
+        seconds = 0
+    if not 1 <= seconds <= MAX_SECONDS:
+        await update.message.reply_text(f"❌ *Uso:* `/profile [segundos]` (1 a {MAX_SECONDS})", parse_mode='Markdown')
+        return
+
+    if profiler.running:
+        await update.message.reply_text("⏳ *Ya hay un perfilado en curso*", parse_mode='Markdown')
+        return
+
+    chat_id = update.effective_chat.id
+    bot = context.bot
+
+    async def send_result(result):
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        try:
+            await bot.send_document(
+                chat_id,
+                document=io.BytesIO(result.summary().encode('utf-8')),
+                filename=f"profile_{stamp}_top.txt",
+                caption=f"🔥 *Perfil de {seconds}s:* {result.total} muestras, funciones con más tiempo por comando",
+                parse_mode='Markdown'
+            )
+            await bot.send_document(
+                chat_id,
+                document=io.BytesIO(result.collapsed().encode('utf-8')),
+                filename=f"profile_{stamp}.collapsed.txt",
+                caption="📊 Pilas colapsadas para flamegraph.pl o speedscope.app"
+            )
+        except Exception as e:
+            logger.error(f"Could not send profile: {e}")
+
+    # The update processor handles one update at a time, profile in the background
+    profiler.start(seconds, send_result)
+    await update.message.reply_text(
+        f"🔬 *Perfilando el bot durante {seconds} segundos...*\n\nTe enviaré los resultados al terminar",
+        parse_mode='Markdown'
+    )
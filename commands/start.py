@@ -2,11 +2,15 @@ import asyncio
 from datetime import datetime
 import pytz
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.error import BadRequest
 from telegram.ext import ContextTypes
 from database.database import DatabaseManager
+from utils.media import media_cache
 
 db_manager = DatabaseManager()
 
+RIAS_IMAGE_URL = "https://64.media.tumblr.com/1e9db433c8a7ae67b4a15fe89be0dac6/abcc58c76184ec29-14/s400x600/52756da1d8e3438fd4dcc98ce02d3ef5d8cdf19f.jpg"
+
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /start command"""
     user = update.effective_user
@@ -27,16 +31,16 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # Create or get user from database
     user_data = await db_manager.get_user(user.id)
     if not user_data:
-        await db_manager.create_user(
+        # create_user reads the new row back from the primary, a replica may lag behind
+        user_data = await db_manager.create_user(
             user.id, 
             user.username, 
             user.first_name, 
             user.last_name or ""
         )
-        user_data = await db_manager.get_user(user.id)
     
     # Get rank info
-    rank_info = await db_manager.get_rank_info(user_data['rank'])
+    rank_info = await db_manager.get_rank_info(user_data.rank)
     
     # Create keyboard with Kenny_kx button
     keyboard = [
@@ -65,10 +69,25 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 💫 *¡Disfruta de tu experiencia con Rias Gremory!* 💫
     """
     
-    # Send message with image and button
-    await update.message.reply_photo(
-        photo="https://64.media.tumblr.com/1e9db433c8a7ae67b4a15fe89be0dac6/abcc58c76184ec29-14/s400x600/52756da1d8e3438fd4dcc98ce02d3ef5d8cdf19f.jpg",
-        caption=welcome_text,
-        reply_markup=reply_markup,
-        parse_mode='Markdown'
-    )
\ No newline at end of file
+    # Send message with image and button, reusing the uploaded file after the first time
+    photo = media_cache.get(RIAS_IMAGE_URL)
+    try:
+        message = await update.message.reply_photo(
+            photo=photo,
+            caption=welcome_text,
+            reply_markup=reply_markup,
+            parse_mode='Markdown'
+        )
+    except BadRequest:
+        if photo == RIAS_IMAGE_URL:
+            raise
+        # The stored file_id is no longer valid, send the URL again
+        media_cache.forget(RIAS_IMAGE_URL)
+        message = await update.message.reply_photo(
+            photo=RIAS_IMAGE_URL,
+            caption=welcome_text,
+            reply_markup=reply_markup,
+            parse_mode='Markdown'
+        )
+    if message.photo:
+        media_cache.remember(RIAS_IMAGE_URL, message.photo[-1].file_id)
\ No newline at end of file
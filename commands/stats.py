@@ -0,0 +1,40 @@
+from telegram import Update
+from telegram.ext import ContextTypes
+from database.database import DatabaseManager
+from database.stats import user_stats
+from database.models import Rank, RANKS
+
+db_manager = DatabaseManager()
+
+async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /stats command - Only Issei and Admin can view stats"""
+    user = update.effective_user
+
+    # Check if user has permission
+    rank = await db_manager.get_user_rank(user.id)
+    if rank not in [Rank.ISSEI, Rank.ADMIN]:
+        await update.message.reply_text("❌ *Error: Solo Issei y Administradores pueden ver las estadísticas*", parse_mode='Markdown')
+        return
+
+    # Counters are maintained in memory, no query needed
+    stats = user_stats.snapshot()
+
+    rank_lines = []
+    for rank_name in RANKS:
+        rank_info = await db_manager.get_rank_info(rank_name)
+        rank_lines.append(f"• {rank_info['emoji']} *{rank_info['name']}:* {stats['ranks'][rank_name]}")
+
+    reconciled_at = stats['reconciled_at']
+    reconciled_text = reconciled_at.strftime('%d/%m/%Y %H:%M') if reconciled_at else 'Pendiente'
+
+    stats_text = (
+        f"📊 *Estadísticas - Rias Gremory Bot* 📊\n\n"
+        f"👥 *Usuarios totales:* {stats['total']}\n"
+        f"✅ *Usuarios activos:* {stats['active']}\n"
+        f"⏳ *Expiran esta semana:* {stats['expiring_week']}\n\n"
+        f"🎭 *Por rango:*\n"
+        + "\n".join(rank_lines) +
+        f"\n\n🔄 *Última sincronización:* {reconciled_text}"
+    )
+
+    await update.message.reply_text(stats_text, parse_mode='Markdown')
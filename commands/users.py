@@ -0,0 +1,87 @@
+import os
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.ext import ContextTypes
+from telegram.helpers import escape_markdown
+from database.database import DatabaseManager
+from database.models import Rank, RANKS
+
+db_manager = DatabaseManager()
+
+PAGE_SIZE = int(os.getenv('USERS_PAGE_SIZE', '10'))
+
+async def render_users_page(rank: Rank, after_id: int = None, before_id: int = None):
+    """Build the text and keyboard for one page of users"""
+    rows, has_more = await db_manager.list_users_by_rank(rank, after_id=after_id, before_id=before_id, limit=PAGE_SIZE)
+    rank_info = await db_manager.get_rank_info(rank)
+
+    if not rows:
+        return f"{rank_info['emoji']} *No hay usuarios con rango {rank_info['name']}*", None
+
+    lines = [f"{rank_info['emoji']} *Usuarios {rank_info['name']}*\n"]
+    for listed_user in rows:
+        name = escape_markdown(listed_user.first_name or 'Sin nombre')
+        user_text = f"`@{listed_user.username}`" if listed_user.username else 'Sin usuario'
+        expires_text = listed_user.expires_at.strftime('%d/%m/%Y') if listed_user.expires_at else 'Sin expiración'
+        lines.append(f"• {name} - {user_text}\n  🆔 `{listed_user.telegram_id}` ⏰ {expires_text}")
+
+    # Going forward there is always a previous page unless this is the first one,
+    # going backward there is always a next page
+    if before_id is not None:
+        has_prev, has_next = has_more, True
+    else:
+        has_prev, has_next = after_id is not None, has_more
+
+    buttons = []
+    if has_prev:
+        buttons.append(InlineKeyboardButton("⬅️ Anterior", callback_data=f"users:{rank}:p:{rows[0].id}"))
+    if has_next:
+        buttons.append(InlineKeyboardButton("Siguiente ➡️", callback_data=f"users:{rank}:n:{rows[-1].id}"))
+
+    reply_markup = InlineKeyboardMarkup([buttons]) if buttons else None
+    return "\n".join(lines), reply_markup
+
+async def users_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /users command - Only Issei and Admin can list users"""
+    user = update.effective_user
+
+    # Check if user has permission
+    rank = await db_manager.get_user_rank(user.id)
+    if rank not in [Rank.ISSEI, Rank.ADMIN]:
+        await update.message.reply_text("❌ *Error: Solo Issei y Administradores pueden listar usuarios*", parse_mode='Markdown')
+        return
+
+    if not context.args or context.args[0].lower() not in RANKS:
+        await update.message.reply_text(f"❌ *Uso:* `/users <{'|'.join(RANKS)}>`", parse_mode='Markdown')
+        return
+
+    text, reply_markup = await render_users_page(Rank(context.args[0].lower()))
+    await update.message.reply_text(text, reply_markup=reply_markup, parse_mode='Markdown')
+
+async def users_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle next/prev buttons of the /users listing"""
+    query = update.callback_query
+
+    # Check if user has permission
+    rank = await db_manager.get_user_rank(query.from_user.id)
+    if rank not in [Rank.ISSEI, Rank.ADMIN]:
+        await query.answer("❌ Sin permiso", show_alert=True)
+        return
+
+    await query.answer()
+
+    # callback_data: users:<rank>:<n|p>:<cursor id>
+    try:
+        _, list_rank, direction, cursor_id = query.data.split(':')
+        cursor_id = int(cursor_id)
+    except ValueError:
+        return
+    if list_rank not in RANKS:
+        return
+    list_rank = Rank(list_rank)
+
+    if direction == 'p':
+        text, reply_markup = await render_users_page(list_rank, before_id=cursor_id)
+    else:
+        text, reply_markup = await render_users_page(list_rank, after_id=cursor_id)
+
+    await query.edit_message_text(text, reply_markup=reply_markup, parse_mode='Markdown')
@@ -0,0 +1,41 @@
+# Bots que se ejecutan en este proceso
+# BOTS_CONFIG apunta a un archivo JSON con una lista de bots, por ejemplo:
+#   [{"name": "rias", "token": "123:abc", "table_prefix": ""},
+#    {"name": "akeno", "token": "456:def", "table_prefix": "akeno_"}]
+# Cada bot usa sus propias tablas (prefijo + nombre de la tabla) en la misma base de datos.
+# Sin BOTS_CONFIG se ejecuta un único bot con BOT_TOKEN y las tablas sin prefijo.
+import json
+import os
+from dataclasses import dataclass
+from database.tenant import validate_prefix
+
+@dataclass(frozen=True, slots=True)
+class BotConfig:
+    name: str
+    token: str
+    table_prefix: str = ''
+
+def load_bot_configs() -> list:
+    """Obtiene la lista de bots desde BOTS_CONFIG o BOT_TOKEN"""
+    path = os.getenv('BOTS_CONFIG')
+    if not path:
+        token = os.getenv('BOT_TOKEN')
+        return [BotConfig('rias', token)] if token else []
+
+    with open(path, 'r', encoding='utf-8') as f:
+        entries = json.load(f)
+
+    configs = []
+    for i, entry in enumerate(entries):
+        if not entry.get('token'):
+            raise ValueError(f"Bot {i} in {path} has no token")
+        configs.append(BotConfig(
+            name=entry.get('name') or f"bot{i}",
+            token=entry['token'],
+            table_prefix=validate_prefix(entry.get('table_prefix', ''))
+        ))
+
+    prefixes = [config.table_prefix for config in configs]
+    if len(set(prefixes)) != len(prefixes):
+        raise ValueError(f"Bots in {path} must have different table prefixes")
+    return configs
@@ -0,0 +1,39 @@
+# Límites anti-flood por rango: (comandos por segundo, ráfaga máxima)
+# Se pueden cambiar con variables de entorno FLOOD_<RANGO>=tasa/ráfaga, por ejemplo FLOOD_FREE_USER=0.5/5
+import os
+from database.models import Rank
+
+DEFAULT_FLOOD_LIMITS = {
+    Rank.FREE_USER: (0.5, 5),
+    Rank.PREMIUM: (1, 10),
+    Rank.SELLER: (3, 30),
+    # Issei y Admin no tienen límite
+}
+
+# Límite por chat de grupo
+DEFAULT_CHAT_FLOOD_LIMIT = (2, 20)
+
+def parse_limit(value: str, default):
+    """Convierte 'tasa/ráfaga' en una tupla"""
+    if not value:
+        return default
+    try:
+        rate, burst = value.split('/')
+        rate, burst = float(rate), float(burst)
+    except ValueError:
+        return default
+    # Con tasa o ráfaga 0 nadie podría usar el bot y el tiempo de rellenado no está definido
+    if rate <= 0 or burst <= 0:
+        return default
+    return rate, burst
+
+def get_flood_limits() -> dict:
+    """Obtiene los límites por rango aplicando las variables de entorno"""
+    return {
+        rank: parse_limit(os.getenv(f'FLOOD_{rank.value.upper()}'), limit)
+        for rank, limit in DEFAULT_FLOOD_LIMITS.items()
+    }
+
+def get_chat_flood_limit():
+    """Obtiene el límite por chat aplicando la variable de entorno"""
+    return parse_limit(os.getenv('FLOOD_CHAT'), DEFAULT_CHAT_FLOOD_LIMIT)
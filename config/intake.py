@@ -0,0 +1,20 @@
+# Prioridades de la cola de entrada de actualizaciones: primero se atiende la de menor número
+# y, con la cola llena, primero se descarta la de mayor número
+from database.models import Rank
+
+PRIORITY_NAMES = ('admin', 'paid', 'default', 'low')
+
+RANK_PRIORITIES = {
+    Rank.ISSEI: 0,
+    Rank.ADMIN: 0,
+    Rank.SELLER: 1,
+    Rank.PREMIUM: 1,
+    Rank.FREE_USER: 2,
+}
+
+# Comandos que un Free User repite mucho en un pico (por ejemplo tras una publicación
+# en un canal), van a la prioridad más baja junto con los mensajes sin comando
+LOW_PRIORITY_COMMANDS = {'start'}
+
+# Los comandos descartados de esta lista reciben el aviso de bot ocupado
+BUSY_REPLY_COMMANDS = {'start'}
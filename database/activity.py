@@ -0,0 +1,89 @@
+import asyncio
+import logging
+import os
+from datetime import datetime
+from database.cache import username_cache
+from database.tenant import current_tenant
+
+logger = logging.getLogger('RiasBot')
+
+class ActivityTracker:
+    """Coalesces last-seen and profile updates into one batched upsert per interval
+
+    Each user has at most one pending entry, so a user sending a hundred messages
+    in an interval still costs a single row in the next flush. Entries are kept
+    per table prefix when several bots share the process.
+    """
+
+    def __init__(self, flush_interval: float = 60):
+        self.flush_interval = flush_interval
+        self.db_manager = None
+        # (table prefix, telegram_id) -> (username, first_name, last_name, last_seen_at)
+        self._dirty = {}
+        self._lock = asyncio.Lock()
+        self._task = None
+
+    def record(self, user):
+        """Remember the latest profile and activity time of a Telegram user"""
+        if user is None or user.is_bot:
+            return
+        username_cache.remember(user.username, user.id)
+        self._dirty[(current_tenant.get(), user.id)] = (user.username, user.first_name, user.last_name or "", datetime.now())
+
+    async def track_update(self, update, context):
+        """Handler callback recording the sender of every update"""
+        self.record(update.effective_user)
+
+    def start(self, db_manager):
+        """Start the background flusher"""
+        self.db_manager = db_manager
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flusher and write what is still pending"""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.warning(f"Could not flush user activity on shutdown: {e}")
+
+    async def flush(self):
+        """Write all pending entries as one upsert"""
+        async with self._lock:
+            if not self._dirty or not self.db_manager:
+                return
+            dirty, self._dirty = self._dirty, {}
+            by_tenant = {}
+            for (tenant, telegram_id), entry in dirty.items():
+                by_tenant.setdefault(tenant, []).append((telegram_id, *entry))
+            written = set()
+            try:
+                for tenant, rows in by_tenant.items():
+                    token = current_tenant.set(tenant)
+                    try:
+                        await self.db_manager.upsert_user_activity(rows)
+                    finally:
+                        current_tenant.reset(token)
+                    written.add(tenant)
+            except Exception:
+                # Entries recorded meanwhile are newer, keep them
+                for key, entry in dirty.items():
+                    if key[0] not in written:
+                        self._dirty.setdefault(key, entry)
+                raise
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.warning(f"User activity flush failed, will retry: {e}")
+
+    def __len__(self):
+        return len(self._dirty)
+
+activity_tracker = ActivityTracker(flush_interval=float(os.getenv('ACTIVITY_FLUSH_INTERVAL', '60')))
@@ -0,0 +1,127 @@
+import asyncio
+import json
+import logging
+import os
+from datetime import datetime
+from database.tenant import current_tenant
+
+logger = logging.getLogger('RiasBot')
+
+class AuditLog:
+    """Buffers rank_audit records in memory and writes them in batches
+
+    record() never waits on the database, a background task flushes the buffer
+    every `flush_interval` seconds or as soon as `flush_size` records are pending.
+    Records that cannot be written on shutdown are spilled to a local file and
+    loaded again on the next start. The buffer is shared by every bot in the
+    process, each record remembers the table prefix of the bot that made it.
+    """
+
+    def __init__(self, flush_interval: float = 0.5, flush_size: int = 100,
+                 max_pending: int = 100000, spill_path: str = 'logs/rank_audit_pending.jsonl'):
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self.max_pending = max_pending
+        self.spill_path = spill_path
+        self.db_manager = None
+        self._pending = []
+        self._wakeup = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._task = None
+
+    def record(self, actor_id, target_id: int, old_rank, new_rank, days=None, source: str = 'grant'):
+        """Queue a rank change, actor_id is None for automatic changes"""
+        self._pending.append((actor_id, target_id, old_rank, new_rank, days, source, datetime.now(), current_tenant.get()))
+        if len(self._pending) >= self.flush_size:
+            self._wakeup.set()
+
+    def start(self, db_manager):
+        """Start the background flusher"""
+        self.db_manager = db_manager
+        self._load_spilled()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flusher and write everything still pending"""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Could not flush rank audit on shutdown, spilling to {self.spill_path}: {e}")
+            self._spill()
+
+    async def flush(self):
+        """Write all pending records as one multi-row insert"""
+        async with self._lock:
+            if not self._pending or not self.db_manager:
+                return
+            batch, self._pending = self._pending, []
+            by_tenant = {}
+            for record in batch:
+                by_tenant.setdefault(record[7], []).append(record)
+            written = set()
+            try:
+                for tenant, records in by_tenant.items():
+                    token = current_tenant.set(tenant)
+                    try:
+                        await self.db_manager.insert_rank_audit([record[:7] for record in records])
+                    finally:
+                        current_tenant.reset(token)
+                    written.add(tenant)
+            except Exception:
+                # Keep the order, newer records were queued while writing
+                self._pending = [record for record in batch if record[7] not in written] + self._pending
+                if len(self._pending) > self.max_pending:
+                    self._spill()
+                raise
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.warning(f"Rank audit flush failed, will retry: {e}")
+
+    def _spill(self):
+        """Move pending records to the spill file"""
+        try:
+            os.makedirs(os.path.dirname(self.spill_path), exist_ok=True)
+            with open(self.spill_path, 'a', encoding='utf-8') as f:
+                for actor_id, target_id, old_rank, new_rank, days, source, created_at, tenant in self._pending:
+                    f.write(json.dumps([actor_id, target_id, old_rank, new_rank, days, source, created_at.isoformat(), tenant]) + "\n")
+            self._pending = []
+        except Exception as e:
+            logger.error(f"Could not spill rank audit records: {e}")
+
+    def _load_spilled(self):
+        """Queue records spilled by a previous run"""
+        if not os.path.exists(self.spill_path):
+            return
+        try:
+            with open(self.spill_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    # Files spilled before multi-bot support have no prefix
+                    actor_id, target_id, old_rank, new_rank, days, source, created_at, *tenant = json.loads(line)
+                    self._pending.append((actor_id, target_id, old_rank, new_rank, days, source,
+                                          datetime.fromisoformat(created_at), tenant[0] if tenant else ''))
+            os.remove(self.spill_path)
+            logger.info(f"Loaded {len(self._pending)} spilled rank audit records")
+        except Exception as e:
+            logger.error(f"Could not load spilled rank audit records: {e}")
+
+    def __len__(self):
+        return len(self._pending)
+
+# Shared by every DatabaseManager instance in the process
+audit_log = AuditLog(
+    flush_interval=int(os.getenv('AUDIT_FLUSH_INTERVAL_MS', '500')) / 1000,
+    flush_size=int(os.getenv('AUDIT_FLUSH_SIZE', '100'))
+)
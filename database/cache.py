@@ -0,0 +1,160 @@
+import os
+import time
+from collections import OrderedDict
+from database.models import Rank
+from database.tenant import current_tenant
+
+class UserCache:
+    """LRU cache of User records by telegram_id with a time to live
+
+    The cache is shared by every bot in the process, the users of a bot with a
+    table prefix are keyed by (prefix, telegram_id) so they never mix.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: float = 60):
+        self.max_size = max_size
+        self.ttl = ttl
+        # telegram_id or (prefix, telegram_id) -> (stored_at, User)
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        # Called with a telegram_id whenever a user changes, e.g. to tell other worker processes
+        self._listeners = []
+        # Same keys -> Rank of the users above free_user. Never expires nor evicted,
+        # the update intake reads it to prioritize staff whose entry went stale
+        self._ranks = {}
+
+    @staticmethod
+    def _key(telegram_id: int):
+        tenant = current_tenant.get()
+        return (tenant, telegram_id) if tenant else telegram_id
+
+    def get(self, telegram_id: int):
+        """Return the cached User or None if missing or stale"""
+        key = self._key(telegram_id)
+        entry = self._entries.get(key)
+        if entry is None or time.monotonic() - entry[0] > self.ttl:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, user):
+        """Store a User, evicting the least recently used entry when full"""
+        if user is None:
+            return
+        key = self._key(user.telegram_id)
+        self._entries[key] = (time.monotonic(), user)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        if user.rank == Rank.FREE_USER:
+            self._ranks.pop(key, None)
+        else:
+            self._ranks[key] = user.rank
+
+    def rank(self, telegram_id: int):
+        """Last known rank above free_user, None for free and unknown users"""
+        return self._ranks.get(self._key(telegram_id))
+
+    def load_ranks(self, rows):
+        """Replace the ranks of the current bot with (telegram_id, rank) rows"""
+        tenant = current_tenant.get()
+        self._ranks = {
+            key: rank for key, rank in self._ranks.items()
+            if (key[0] if isinstance(key, tuple) else '') != tenant
+        }
+        for telegram_id, rank in rows:
+            rank = Rank.parse(rank)
+            if rank != Rank.FREE_USER:
+                self._ranks[self._key(telegram_id)] = rank
+
+    def rank_count(self) -> int:
+        return len(self._ranks)
+
+    def invalidate(self, telegram_id: int, publish: bool = True):
+        """Forget a user so the next read goes to the database"""
+        self._entries.pop(self._key(telegram_id), None)
+        if publish:
+            self.publish(telegram_id)
+
+    def add_listener(self, callback):
+        """Register a callback notified of every changed user"""
+        self._listeners.append(callback)
+
+    def publish(self, telegram_id: int):
+        """Notify listeners that a user changed in the database"""
+        for callback in self._listeners:
+            callback(telegram_id)
+
+    def users(self):
+        """Fresh cached Users of the current bot, least recently used first"""
+        now = time.monotonic()
+        tenant = current_tenant.get()
+        return [
+            user for key, (stored_at, user) in self._entries.items()
+            if now - stored_at <= self.ttl and (key[0] if isinstance(key, tuple) else '') == tenant
+        ]
+
+    def clear(self):
+        self._entries.clear()
+        self._ranks.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+class UsernameCache:
+    """Lowercased username -> telegram_id of recently seen users
+
+    Kept fresh from incoming updates, so resolving an @username usually needs no
+    query. Usernames are global in Telegram, the map is shared by every bot.
+    """
+
+    def __init__(self, max_size: int = 100000):
+        self.max_size = max_size
+        self._ids = OrderedDict()
+        # telegram_id -> current key, to drop the old handle when a user renames
+        self._names = {}
+
+    @staticmethod
+    def normalize(username: str) -> str:
+        return username.lstrip('@').lower()
+
+    def get(self, username: str):
+        return self._ids.get(self.normalize(username))
+
+    def remember(self, username: str, telegram_id: int):
+        """Map username to telegram_id, None when the user has no username anymore"""
+        key = self.normalize(username) if username else None
+        old_key = self._names.get(telegram_id)
+        if old_key is not None and old_key != key:
+            # A renamed user must not keep resolving by the handle someone else may take
+            del self._names[telegram_id]
+            if self._ids.get(old_key) == telegram_id:
+                del self._ids[old_key]
+        if key is None:
+            return
+
+        previous_id = self._ids.get(key)
+        if previous_id is not None and previous_id != telegram_id and self._names.get(previous_id) == key:
+            # The handle moved to another user
+            del self._names[previous_id]
+        self._ids[key] = telegram_id
+        self._ids.move_to_end(key)
+        self._names[telegram_id] = key
+        if len(self._ids) > self.max_size:
+            evicted_key, evicted_id = self._ids.popitem(last=False)
+            if self._names.get(evicted_id) == evicted_key:
+                del self._names[evicted_id]
+
+    def __len__(self):
+        return len(self._ids)
+
+# Shared by every DatabaseManager instance in the process
+user_cache = UserCache(
+    max_size=int(os.getenv('USER_CACHE_SIZE', '10000')),
+    ttl=float(os.getenv('USER_CACHE_TTL', '60'))
+)
+
+username_cache = UsernameCache(max_size=int(os.getenv('USERNAME_CACHE_SIZE', '100000')))
@@ -0,0 +1,70 @@
+from dataclasses import dataclass
+from datetime import datetime
+from enum import StrEnum
+
+class Rank(StrEnum):
+    """User ranks, from highest to lowest"""
+    ISSEI = 'issei'
+    ADMIN = 'admin'
+    SELLER = 'seller'
+    PREMIUM = 'premium'
+    FREE_USER = 'free_user'
+
+    @classmethod
+    def parse(cls, value: str) -> 'Rank':
+        """Convert a stored rank, unknown values fall back to free_user"""
+        try:
+            return cls(value)
+        except ValueError:
+            return cls.FREE_USER
+
+    def outranks(self, other: 'Rank') -> bool:
+        """Tell if this rank is strictly higher than `other`"""
+        return RANKS.index(self) < RANKS.index(other)
+
+RANKS = list(Rank)
+
+# Telegram ID of Issei, the owner of the bot
+OWNER_ID = 7560671542
+
+# Explicit column list decoded by User.from_row, never SELECT *
+USER_COLUMNS = "id, telegram_id, username, first_name, last_name, `rank`, created_at, expires_at, is_active"
+
+@dataclass(frozen=True, slots=True)
+class User:
+    """A row of the users table"""
+    id: int
+    telegram_id: int
+    username: str | None
+    first_name: str | None
+    last_name: str | None
+    rank: Rank
+    created_at: datetime
+    expires_at: datetime | None
+    is_active: bool
+
+    @classmethod
+    def from_row(cls, row) -> 'User':
+        """Build a User from a row selected with USER_COLUMNS"""
+        return cls(row[0], row[1], row[2], row[3], row[4], Rank.parse(row[5]), row[6], row[7], bool(row[8]))
+
+    def to_row(self) -> tuple:
+        """The inverse of from_row"""
+        return (self.id, self.telegram_id, self.username, self.first_name, self.last_name,
+                self.rank.value, self.created_at, self.expires_at, self.is_active)
+
+USER_SUMMARY_COLUMNS = "id, telegram_id, username, first_name, expires_at"
+
+@dataclass(frozen=True, slots=True)
+class UserSummary:
+    """The columns shown in user listings"""
+    id: int
+    telegram_id: int
+    username: str | None
+    first_name: str | None
+    expires_at: datetime | None
+
+    @classmethod
+    def from_row(cls, row) -> 'UserSummary':
+        """Build a UserSummary from a row selected with USER_SUMMARY_COLUMNS"""
+        return cls(*row)
@@ -0,0 +1,185 @@
+import asyncio
+import json
+import logging
+import pickle
+import time
+import zlib
+from collections import OrderedDict
+from telegram.ext import BasePersistence, PersistenceInput
+
+logger = logging.getLogger('RiasBot')
+
+class DatabasePersistence(BasePersistence):
+    """PTB persistence stored in the bot_persistence table
+
+    user_data and chat_data are loaded lazily: nothing is read on start, and the
+    data of a user or chat is read once, the first time a handler runs for it.
+    Every update_interval the Application hands over the data it touched; only
+    entries whose pickled value changed since the last load or write are sent,
+    all of them in a single transaction. bot_data, callback_data and
+    conversation states are small and loaded on start as PTB requires.
+    Users and chats idle for two intervals were already written, their
+    bookkeeping is dropped so it stays proportional to the active ones.
+    """
+
+    def __init__(self, db_manager, store_data: PersistenceInput = None, update_interval: float = 60):
+        super().__init__(store_data=store_data, update_interval=update_interval)
+        self.db_manager = db_manager
+        # Users and chats whose stored data was already merged into the Application,
+        # id -> last time a handler used it, least recently used first
+        self._loaded_users = OrderedDict()
+        self._loaded_chats = OrderedDict()
+        # (kind, data_key) -> checksum of the stored value, to skip unchanged writes
+        self._checksums = {}
+        # (kind, data_key) -> pickled data, or None to delete the entry
+        self._pending = {}
+        self._write_task = None
+
+    @staticmethod
+    def _dump(data) -> bytes:
+        return pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+
+    async def _save(self, kind: str, data_key: str, data):
+        """Stage a changed entry and wait for the batched write that includes it"""
+        key = (kind, data_key)
+        if data is None:
+            self._pending[key] = None
+        else:
+            payload = self._dump(data)
+            if self._checksums.get(key) == zlib.crc32(payload) and key not in self._pending:
+                return
+            self._pending[key] = payload
+
+        while key in self._pending:
+            if self._write_task is None or self._write_task.done():
+                # Application.update_persistence stages every entry before this task runs
+                self._write_task = asyncio.create_task(self._write_pending())
+            await asyncio.shield(self._write_task)
+
+    async def _write_pending(self):
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, {}
+        upserts = [(kind, data_key, payload) for (kind, data_key), payload in batch.items() if payload is not None]
+        deletes = [key for key, payload in batch.items() if payload is None]
+        try:
+            await self.db_manager.save_persistence(upserts, deletes)
+        except Exception:
+            # Entries staged meanwhile are newer, keep them
+            for key, payload in batch.items():
+                self._pending.setdefault(key, payload)
+            raise
+        for kind, data_key, payload in upserts:
+            self._checksums[(kind, data_key)] = zlib.crc32(payload)
+        for key in deletes:
+            self._checksums.pop(key, None)
+
+    def _touch(self, loaded: OrderedDict, data_id: int):
+        loaded[data_id] = time.monotonic()
+        loaded.move_to_end(data_id)
+        # Runs with the traffic, usually stopping at the first entry
+        self._evict_idle()
+
+    def _evict_idle(self):
+        """Forget users and chats no handler used for two intervals
+
+        The Application hands over the data of every user and chat a handler used
+        at the next interval, so after two the stored data matches memory. A new
+        handler reloads it first, merging the same values back.
+        """
+        idle_since = time.monotonic() - 2 * self.update_interval
+        for kind, loaded in (('user', self._loaded_users), ('chat', self._loaded_chats)):
+            while loaded:
+                data_id, used_at = next(iter(loaded.items()))
+                key = (kind, str(data_id))
+                if used_at > idle_since or key in self._pending:
+                    break
+                del loaded[data_id]
+                self._checksums.pop(key, None)
+
+    async def _load(self, kind: str, data_key: str):
+        payload = await self.db_manager.load_persistence(kind, data_key)
+        if payload is None:
+            return None
+        self._checksums[(kind, data_key)] = zlib.crc32(payload)
+        return pickle.loads(payload)
+
+    async def get_user_data(self):
+        # Loaded per user in refresh_user_data
+        return {}
+
+    async def get_chat_data(self):
+        return {}
+
+    async def get_bot_data(self):
+        return await self._load('bot', '') or {}
+
+    async def get_callback_data(self):
+        return await self._load('callback', '')
+
+    async def get_conversations(self, name: str):
+        kind = f'conversation:{name}'
+        conversations = {}
+        for data_key, payload in await self.db_manager.load_persistence(kind):
+            self._checksums[(kind, data_key)] = zlib.crc32(payload)
+            conversations[tuple(json.loads(data_key))] = pickle.loads(payload)
+        return conversations
+
+    async def refresh_user_data(self, user_id: int, user_data):
+        if user_id in self._loaded_users:
+            self._touch(self._loaded_users, user_id)
+            return
+        stored = await self._load('user', str(user_id))
+        if stored:
+            user_data.update(stored)
+        self._touch(self._loaded_users, user_id)
+
+    async def refresh_chat_data(self, chat_id: int, chat_data):
+        if chat_id in self._loaded_chats:
+            self._touch(self._loaded_chats, chat_id)
+            return
+        stored = await self._load('chat', str(chat_id))
+        if stored:
+            chat_data.update(stored)
+        self._touch(self._loaded_chats, chat_id)
+
+    async def refresh_bot_data(self, bot_data):
+        # This process is the only writer of bot_data
+        pass
+
+    async def update_user_data(self, user_id: int, data):
+        # Never loaded means no handler saw it, writing it would erase the stored data
+        if user_id not in self._loaded_users:
+            return
+        await self._save('user', str(user_id), data)
+
+    async def update_chat_data(self, chat_id: int, data):
+        if chat_id not in self._loaded_chats:
+            return
+        await self._save('chat', str(chat_id), data)
+
+    async def update_bot_data(self, data):
+        await self._save('bot', '', data)
+
+    async def update_callback_data(self, data):
+        await self._save('callback', '', data)
+
+    async def update_conversation(self, name: str, key, new_state):
+        await self._save(f'conversation:{name}', json.dumps(list(key)), new_state)
+
+    async def drop_user_data(self, user_id: int):
+        self._loaded_users.pop(user_id, None)
+        await self._save('user', str(user_id), None)
+
+    async def drop_chat_data(self, chat_id: int):
+        self._loaded_chats.pop(chat_id, None)
+        await self._save('chat', str(chat_id), None)
+
+    async def flush(self):
+        """Called by Application.stop(), write whatever is still staged"""
+        if self._write_task:
+            await asyncio.gather(self._write_task, return_exceptions=True)
+        try:
+            await self._write_pending()
+        except Exception as e:
+            logger.error(f"Could not flush persistence on shutdown: {e}")
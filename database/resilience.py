@@ -0,0 +1,105 @@
+import asyncio
+import functools
+import random
+import time
+from contextvars import ContextVar
+import pymysql
+
+# MySQL error codes that mean the server could not be reached or went away
+CONNECTION_ERROR_CODES = {
+    1040,  # Too many connections
+    1053,  # Server shutdown in progress
+    2003,  # Can't connect to MySQL server
+    2006,  # MySQL server has gone away
+    2013,  # Lost connection to MySQL server during query
+    2055,  # Lost connection to MySQL server at '%s'
+}
+
+# Pool used by the read operation currently running in this task
+read_target = ContextVar('read_target', default='primary')
+
+class DatabaseUnavailable(Exception):
+    """Raised when the database cannot be reached or its circuit breaker is open"""
+
+def is_connection_error(error: Exception) -> bool:
+    """Tell if an exception means the database is unreachable rather than a bad query"""
+    if isinstance(error, pymysql.err.InterfaceError):
+        return True
+    if isinstance(error, pymysql.err.OperationalError):
+        return bool(error.args) and error.args[0] in CONNECTION_ERROR_CODES
+    return isinstance(error, (OSError, asyncio.TimeoutError))
+
+def backoff_delay(attempt: int, base: float = 0.1, cap: float = 2.0) -> float:
+    """Exponential backoff with full jitter"""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+class CircuitBreaker:
+    """Fails fast after repeated failures and lets a single probe through once `reset_timeout` passes"""
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self.probe_started_at = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half_open'
+        return 'open'
+
+    def allow(self) -> bool:
+        """Tell if a call may go through, reserving the probe slot when half open"""
+        state = self.state
+        if state == 'closed':
+            return True
+        if state != 'half_open':
+            return False
+        now = time.monotonic()
+        # A probe hanging on a stalled connection gives up its slot after another reset_timeout
+        if self.probing and now - self.probe_started_at < self.reset_timeout:
+            return False
+        self.probing = True
+        self.probe_started_at = now
+        return True
+
+    def release_probe(self):
+        """Free the probe slot of a call that ended without an outcome, e.g. cancelled"""
+        self.probing = False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def record_failure(self) -> bool:
+        """Count a failure, returns True if the breaker just opened"""
+        self.failures += 1
+        was_open = self.opened_at is not None
+        self.probing = False
+        if was_open or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+            return not was_open
+        return False
+
+def read_operation(func=None, *, replica: bool = True):
+    """Mark an idempotent DatabaseManager method: routed to the replica when allowed and retried"""
+    if func is None:
+        return functools.partial(read_operation, replica=replica)
+
+    @functools.wraps(func)
+    async def wrapper(self, *args, **kwargs):
+        return await self.run_read(lambda: func(self, *args, **kwargs), replica=replica)
+    return wrapper
+
+def write_operation(func):
+    """Mark a DatabaseManager method that must run once on the primary"""
+    @functools.wraps(func)
+    async def wrapper(self, *args, **kwargs):
+        return await self.run_write(lambda: func(self, *args, **kwargs))
+    return wrapper
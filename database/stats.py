@@ -0,0 +1,76 @@
+import os
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta
+from database.models import Rank, RANKS
+from database.tenant import TenantLocal
+
+class UserStats:
+    """In-memory user counters kept up to date by DatabaseManager"""
+
+    def __init__(self, cache_ttl: float = 30):
+        self.cache_ttl = cache_ttl
+        self.rank_counts = Counter()
+        self.active_count = 0
+        # Number of users whose rank expires on each day
+        self.expiry_days = Counter()
+        self.reconciled_at = None
+        self._snapshot = None
+        self._snapshot_at = 0.0
+
+    def _invalidate(self):
+        self._snapshot = None
+
+    def record_created(self, rank: Rank = Rank.FREE_USER, is_active: bool = True):
+        """Count a newly inserted user"""
+        self.rank_counts[rank] += 1
+        if is_active:
+            self.active_count += 1
+        self._invalidate()
+
+    def record_rank_change(self, old_rank: Rank, new_rank: Rank, old_expires_at=None, new_expires_at=None):
+        """Move a user between rank and expiry buckets"""
+        if old_rank:
+            self.rank_counts[old_rank] -= 1
+        self.rank_counts[new_rank] += 1
+        if old_expires_at:
+            self.expiry_days[old_expires_at.date()] -= 1
+        if new_expires_at:
+            self.expiry_days[new_expires_at.date()] += 1
+        self._invalidate()
+
+    def record_active_change(self, delta: int):
+        """Adjust the active user counter"""
+        self.active_count += delta
+        self._invalidate()
+
+    def load(self, rank_rows, active_count: int, expiry_rows):
+        """Replace all counters with freshly aggregated values"""
+        self.rank_counts = Counter({rank: count for rank, count in rank_rows})
+        self.active_count = active_count
+        self.expiry_days = Counter({day: count for day, count in expiry_rows})
+        self.reconciled_at = datetime.now()
+        self._invalidate()
+
+    def expiring_within(self, days: int = 7) -> int:
+        """Count users whose rank expires in the next `days` days"""
+        today = date.today()
+        last_day = today + timedelta(days=days)
+        return sum(count for day, count in self.expiry_days.items() if today <= day <= last_day)
+
+    def snapshot(self) -> dict:
+        """Return the current counters, cached for `cache_ttl` seconds"""
+        now = time.monotonic()
+        if self._snapshot is None or now - self._snapshot_at > self.cache_ttl:
+            self._snapshot = {
+                'ranks': {rank: max(self.rank_counts.get(rank, 0), 0) for rank in RANKS},
+                'total': max(sum(self.rank_counts.values()), 0),
+                'active': max(self.active_count, 0),
+                'expiring_week': max(self.expiring_within(7), 0),
+                'reconciled_at': self.reconciled_at,
+            }
+            self._snapshot_at = now
+        return self._snapshot
+
+# Shared by every DatabaseManager instance in the process, one per bot
+user_stats = TenantLocal(lambda tenant: UserStats(cache_ttl=float(os.getenv('STATS_CACHE_TTL', '30'))))
@@ -0,0 +1,56 @@
+import re
+from contextvars import ContextVar
+
+# Table prefix of the bot handling the current task, '' for the single bot setup.
+# Set once at the start of each bot's task, everything it spawns inherits it.
+current_tenant = ContextVar('current_tenant', default='')
+
+TABLE_PREFIX_PATTERN = re.compile(r'^[a-z0-9_]{0,32}$')
+
+def validate_prefix(prefix: str) -> str:
+    """Table prefixes go straight into SQL, only allow safe identifiers"""
+    if not TABLE_PREFIX_PATTERN.match(prefix):
+        raise ValueError(f"Invalid table prefix: {prefix!r}")
+    return prefix
+
+class TableNames:
+    """Table names of the current bot, e.g. tables.users -> 'bot2_users'"""
+
+    def __getattr__(self, name: str) -> str:
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return f"{current_tenant.get()}{name}"
+
+tables = TableNames()
+
+class TenantLocal:
+    """One instance of a per-bot singleton for each bot in the process
+
+    Attribute access is forwarded to the instance of the current bot, so
+    module-level singletons keep working unchanged when several bots share
+    one event loop.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._instances = {}
+
+    def current(self):
+        """Instance of the current bot, named so it does not shadow a get() of the instance"""
+        tenant = current_tenant.get()
+        instance = self._instances.get(tenant)
+        if instance is None:
+            instance = self._instances[tenant] = self._factory(tenant)
+        return instance
+
+    def instances(self) -> list:
+        """Instances created so far, one per bot"""
+        return list(self._instances.values())
+
+    def __getattr__(self, name: str):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.current(), name)
+
+    def __len__(self):
+        return len(self.current())
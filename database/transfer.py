@@ -0,0 +1,186 @@
+import asyncio
+import csv
+import gzip
+import json
+import logging
+import os
+from datetime import datetime
+from itertools import islice
+from database.models import Rank
+
+logger = logging.getLogger('RiasBot')
+
+# Columns of an export file, in order
+EXPORT_FIELDS = ['telegram_id', 'username', 'first_name', 'last_name', 'rank',
+                 'created_at', 'expires_at', 'is_active', 'last_seen_at']
+
+def detect_format(path: str) -> str:
+    """csv or jsonl from the file name, .gz is compressed"""
+    name = path[:-3] if path.endswith('.gz') else path
+    return 'jsonl' if name.endswith(('.jsonl', '.json')) else 'csv'
+
+def open_text(path: str, mode: str):
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8', newline='')
+    return open(path, mode, encoding='utf-8', newline='')
+
+def _format_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+def _parse_datetime(value):
+    return datetime.fromisoformat(value) if value else None
+
+def parse_row(record: dict) -> tuple:
+    """Validate one imported record into the tuple DatabaseManager.import_users expects"""
+    telegram_id = int(record['telegram_id'])
+    rank = Rank(record.get('rank') or Rank.FREE_USER)
+    is_active = str(record.get('is_active', '1')).strip().lower() not in ('0', 'false', '')
+    return (
+        telegram_id,
+        record.get('username') or None,
+        record.get('first_name') or None,
+        record.get('last_name') or "",
+        rank.value,
+        _parse_datetime(record.get('created_at')) or datetime.now(),
+        _parse_datetime(record.get('expires_at')),
+        int(is_active),
+        _parse_datetime(record.get('last_seen_at')),
+    )
+
+class _Writer:
+    """Writes export rows to a CSV or JSONL file, called from a worker thread"""
+
+    def __init__(self, f, fmt: str):
+        self.f = f
+        self.fmt = fmt
+        if fmt == 'csv':
+            self.csv = csv.writer(f)
+            self.csv.writerow(EXPORT_FIELDS)
+
+    def write(self, rows: list):
+        if self.fmt == 'csv':
+            self.csv.writerows(['' if value is None else _format_value(value) for value in row] for row in rows)
+        else:
+            self.f.writelines(
+                json.dumps(dict(zip(EXPORT_FIELDS, map(_format_value, row))), ensure_ascii=False) + "\n"
+                for row in rows
+            )
+
+async def export_users(db_manager, path: str, fmt: str = None, chunk_size: int = 5000, progress=None) -> int:
+    """Stream the users table to a file, returns the number of users written
+
+    Rows come from a server-side cursor and are written chunk by chunk from a
+    worker thread, so memory stays flat and the event loop is never blocked on disk.
+    """
+    fmt = fmt or detect_format(path)
+    f = await asyncio.to_thread(open_text, path, 'w')
+    written = 0
+    try:
+        writer = await asyncio.to_thread(_Writer, f, fmt)
+        batch = []
+        async for row in db_manager.stream_users(chunk_size=chunk_size):
+            # The id is only the keyset cursor, it is not portable between databases
+            batch.append((row[1], row[2], row[3], row[4], row[5], row[6], row[7], bool(row[8]), row[9]))
+            if len(batch) >= 1000:
+                await asyncio.to_thread(writer.write, batch)
+                written += len(batch)
+                batch = []
+                if progress:
+                    progress(written)
+        if batch:
+            await asyncio.to_thread(writer.write, batch)
+            written += len(batch)
+            if progress:
+                progress(written)
+    finally:
+        await asyncio.to_thread(f.close)
+    return written
+
+def _read_records(f, fmt: str):
+    if fmt == 'csv':
+        yield from csv.DictReader(f)
+    else:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+def _progress_path(path: str) -> str:
+    return f"{path}.progress"
+
+def _load_progress(path: str) -> int:
+    """Rows already committed by a previous run of the same file"""
+    try:
+        with open(_progress_path(path), 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        # A different file with the same name starts over
+        if state.get('size') != os.path.getsize(path):
+            return 0
+    except (OSError, ValueError):
+        return 0
+    return state.get('rows', 0)
+
+def _save_progress(path: str, rows: int):
+    tmp_path = f"{_progress_path(path)}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'rows': rows, 'size': os.path.getsize(path)}, f)
+    os.replace(tmp_path, _progress_path(path))
+
+async def _refresh_counters(db_manager):
+    """Recount the user stats and the rank index after an import changed many users"""
+    try:
+        await db_manager.reconcile_stats()
+        await db_manager.load_rank_index()
+    except Exception as e:
+        # Corrected by the next periodic reconciliation
+        logger.warning(f"Could not refresh user stats after the import: {e}")
+
+async def import_users(db_manager, path: str, fmt: str = None, chunk_size: int = 1000,
+                       resume: bool = True, progress=None):
+    """Upsert users from a file in chunks, returns (imported, skipped)
+
+    Each chunk is one multi-row upsert in its own transaction. After every
+    committed chunk the position is saved next to the file, an interrupted
+    import run again with resume continues after the last committed chunk.
+    """
+    fmt = fmt or detect_format(path)
+    done = await asyncio.to_thread(_load_progress, path) if resume else 0
+    f = await asyncio.to_thread(open_text, path, 'r')
+    imported = skipped = 0
+    try:
+        records = _read_records(f, fmt)
+        # Skip what a previous run committed, without keeping it in memory
+        remaining = done
+        while remaining:
+            skipped_now = len(await asyncio.to_thread(lambda: list(islice(records, min(remaining, chunk_size)))))
+            if not skipped_now:
+                break
+            remaining -= skipped_now
+
+        while True:
+            chunk = await asyncio.to_thread(lambda: list(islice(records, chunk_size)))
+            if not chunk:
+                break
+            rows = []
+            for record in chunk:
+                try:
+                    rows.append(parse_row(record))
+                except (KeyError, ValueError, TypeError):
+                    skipped += 1
+            if rows:
+                await db_manager.import_users(rows)
+            imported += len(rows)
+            done += len(chunk)
+            await asyncio.to_thread(_save_progress, path, done)
+            if progress:
+                progress(done)
+    finally:
+        await asyncio.to_thread(f.close)
+        if imported:
+            await _refresh_counters(db_manager)
+
+    # Finished, a new run of the same file starts from the beginning
+    if os.path.exists(_progress_path(path)):
+        os.remove(_progress_path(path))
+    return imported, skipped
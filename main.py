@@ -1,6 +1,7 @@
 import asyncio
 import logging
 import os
+import signal
 import sys
 import traceback
 from datetime import datetime
@@ -35,15 +36,41 @@ setup_basic_logging()
 
 try:
     from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
-    from telegram.ext import Application, CommandHandler, MessageHandler, filters, CallbackQueryHandler, ContextTypes
+    from telegram.ext import Application, CommandHandler, MessageHandler, TypeHandler, filters, CallbackQueryHandler, ContextTypes, PersistenceInput
     from database.database import DatabaseManager
+    from database.resilience import DatabaseUnavailable
+    from database.audit import audit_log
+    from database.activity import activity_tracker
+    from database.cache import user_cache, username_cache
+    from database.persistence import DatabasePersistence
+    from database.tenant import current_tenant
     from commands.start import start_command
     from commands.info import info_command
     from commands.admin import admin_commands
     from commands.logs import logs_command
     from commands.commit_logs import commit_logs_command
+    from commands.stats import stats_command
+    from commands.users import users_command, users_callback
+    from commands.broadcast import broadcast_command, broadcast_engine
+    from commands.keys import generate_key_command, keys_command, keys_callback, redeem_key_command
+    from commands.history import history_command
+    from commands.metrics import metrics_command
+    from commands.export_users import export_users_command
+    from commands.profile import profile_command
+    from commands.memsnap import memsnap_command
     from config.prefixes import is_valid_prefix, get_command_without_prefix
+    from config.bots import load_bot_configs
     from utils.logger import ErrorLogger
+    from utils.flood import flood_control
+    from utils.cluster import ClusterFront, WorkerLink
+    from utils.snapshot import warm_start
+    from utils.metrics import metrics
+    from utils.watchdog import loop_watchdog
+    from utils.intake import update_intake
+    from utils.http import shared_request, create_updates_request, bot_api_urls
+    from utils.runtime import runtime
+    from utils.memory import memory_watchdog
+    from utils.media import media_cache
 except Exception as e:
     log_error_to_file(e, "Import error")
     raise e
@@ -53,81 +80,346 @@ load_dotenv()
 
 # Initialize error logger
 try:
+    bot_configs = load_bot_configs()
     error_logger = ErrorLogger(
-        bot_token=os.getenv('BOT_TOKEN'),
-        error_chat_id=os.getenv('ERROR_CHAT_ID')  # Optional: Chat ID to send errors to
+        # With several bots errors are sent by the first one
+        bot_token=bot_configs[0].token if bot_configs else None,
+        error_chat_id=os.getenv('ERROR_CHAT_ID'),  # Optional: Chat ID to send errors to
+        request=shared_request,
+        **bot_api_urls()
     )
 except Exception as e:
     log_error_to_file(e, "Error logger initialization")
     error_logger = None
 
 class RiasGremoryBot:
-    def __init__(self):
-        self.bot_token = os.getenv('BOT_TOKEN')
+    def __init__(self, worker_index: int = None, socket_path: str = None):
+        self.bots = load_bot_configs()
         self.db_manager = DatabaseManager()
+        self.stop_event = None
+        # In multi-process mode updates come from the front process instead of polling
+        self.worker_link = WorkerLink(worker_index, socket_path) if worker_index is not None else None
+        # Rank expiry and broadcast resume run in a single process
+        self.is_primary = worker_index in (None, 0)
+        self.expiry_check_interval = int(os.getenv('EXPIRY_CHECK_INTERVAL', '60'))
+        self.stats_reconcile_interval = int(os.getenv('STATS_RECONCILE_INTERVAL', '600'))
+        self.metrics_port = int(os.getenv('METRICS_PORT', '0'))
+        self.persistence_interval = float(os.getenv('PERSISTENCE_UPDATE_INTERVAL', '60'))
+        self.worker_index = worker_index
         
     async def start(self):
-        """Start the bot"""
+        """Start every configured bot in this event loop"""
         # Check if bot token is provided
-        if not self.bot_token:
+        if not self.bots:
             log_error_to_file("BOT_TOKEN environment variable is not set", "Bot initialization")
             if error_logger:
                 error_logger.log_error("BOT_TOKEN environment variable is not set", "Bot initialization")
             return
         
         if error_logger:
-            error_logger.log_info(f"Bot token: {self.bot_token[:10]}...")
+            error_logger.log_info(f"Runtime profile: {runtime.describe()}")
+        metrics.set('runtime_profile', 1, profile=runtime.name, loop=runtime.loop, json=runtime.json)
+        
+        try:
+            # Flushers, watchdog and metrics are shared by every bot
+            audit_log.start(self.db_manager)
+            activity_tracker.start(self.db_manager)
+            self.stop_event = asyncio.Event()
+            loop_watchdog.start(on_stall=self.report_stall)
+            self.register_metrics()
+            self.track_memory()
+            memory_watchdog.start(on_alert=self.report_memory_growth, trace=os.getenv('MEMORY_TRACEMALLOC') == '1')
+            if self.metrics_port:
+                # Each worker process exposes its own metrics on the next port
+                await metrics.serve(self.metrics_port + (self.worker_index or 0))
+            
+            # Run until a stop signal is received
+            self.install_signal_handlers()
+            results = await asyncio.gather(
+                *(asyncio.create_task(self.run_bot(config)) for config in self.bots),
+                return_exceptions=True
+            )
+            for result in results:
+                if isinstance(result, BaseException):
+                    raise result
+            
+        except Exception as e:
+            log_error_to_file(e, "Bot startup")
+            if error_logger:
+                error_logger.log_error(e, "Bot startup")
+            raise e
+        finally:
+            # Ensure proper cleanup
+            await loop_watchdog.stop()
+            await memory_watchdog.stop()
+            await metrics.stop()
+            await activity_tracker.stop()
+            # Rank changes made until now must reach the audit table
+            await audit_log.stop()
+            if error_logger:
+                # Last, so the HTTP pool closes once the error reports above were sent
+                await error_logger.close()
+    
+    async def run_bot(self, config):
+        """Run one bot until the stop event, in its own task"""
+        # Tables, caches and singletons of this task and everything it starts belong to this bot
+        current_tenant.set(config.table_prefix)
+        background_tasks = []
+        
+        if error_logger:
+            error_logger.log_info(f"Bot {config.name} token: {config.token[:10]}...")
         
         try:
             # Initialize database
             if error_logger:
-                error_logger.log_info("Initializing database...")
-            await self.db_manager.initialize_database()
+                error_logger.log_info(f"Initializing database for {config.name}...")
+            if not self.worker_link:
+                # In multi-process mode the front creates the tables once
+                await self.db_manager.initialize_database()
+            await self.db_manager.reconcile_stats()
+            if self.worker_index is not None:
+                warm_start.current().path = f"{warm_start.path}.{self.worker_index}"
+            warm_start.load()
+            # Staff keep their intake priority even when their cache entry is stale.
+            # Loaded after the snapshot so its old ranks do not replace the current ones
+            await self.db_manager.load_rank_index()
+            warm_start.start(self.db_manager)
             
             # Create application
             if error_logger:
-                error_logger.log_info("Creating application...")
-            application = Application.builder().token(self.bot_token).build()
-            
-            # Add command handlers (with and without prefixes)
-            application.add_handler(CommandHandler("start", start_command))
-            application.add_handler(CommandHandler("info", info_command))
-            application.add_handler(CommandHandler("logs", logs_command))
-            application.add_handler(CommandHandler("commitlogs", commit_logs_command))
-            
-            # Add admin commands
-            application.add_handler(CommandHandler("addadmin", admin_commands.add_admin))
-            application.add_handler(CommandHandler("addseller", admin_commands.add_seller))
-            application.add_handler(CommandHandler("addpremium", admin_commands.add_premium))
-            
-            # Add message handler for prefixed commands
-            application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_prefixed_commands))
-            
-            # Add callback query handler for buttons
-            application.add_handler(CallbackQueryHandler(self.button_callback))
+                error_logger.log_info(f"Creating application {config.name}...")
+            # Updates wait in a bounded priority queue, the processor also tells the
+            # loop watchdog which handler is running
+            builder = Application.builder().token(config.token).concurrent_updates(update_intake.current())
+            # Every bot sends through the same HTTP connection pool
+            builder = builder.request(shared_request)
+            api_urls = bot_api_urls()
+            if api_urls:
+                builder = builder.base_url(api_urls['base_url']).base_file_url(api_urls['base_file_url'])
+            if self.worker_link:
+                builder = builder.updater(None)
+            else:
+                builder = builder.get_updates_request(create_updates_request())
+            # user_data and conversations survive restarts, loaded per user on first use
+            builder = builder.persistence(self.create_persistence())
+            application = builder.build()
+            self.add_handlers(application)
+            # Per bot state of PTB, kept for every user and chat seen since start
+            memory_watchdog.track(f'user_data:{config.name}', lambda: len(application.user_data))
+            memory_watchdog.track(f'chat_data:{config.name}', lambda: len(application.chat_data))
+            memory_watchdog.track(f'update_queue:{config.name}', lambda: application.update_queue.qsize())
             
             # Start the bot
             if error_logger:
-                error_logger.log_info("Starting bot...")
+                error_logger.log_info(f"Starting bot {config.name}...")
             await application.initialize()
             await application.start()
+            if self.worker_link:
+                await self.worker_link.start(application, self.stop_event)
+            else:
+                await application.updater.start_polling(allowed_updates=Update.ALL_TYPES)
+            background_tasks = self.start_background_tasks()
+            if self.is_primary:
+                await broadcast_engine.resume(application.bot)
             if error_logger:
-                error_logger.log_info("Bot started successfully!")
-            await application.run_polling(allowed_updates=Update.ALL_TYPES)
+                error_logger.log_info(f"Bot {config.name} started successfully!")
+            
+            await self.stop_event.wait()
             
         except Exception as e:
-            log_error_to_file(e, "Bot startup")
-            if error_logger:
-                error_logger.log_error(e, "Bot startup")
+            log_error_to_file(e, f"Bot {config.name} startup")
+            # The other bots stop too instead of running half of the setup
+            self.stop_event.set()
             raise e
         finally:
-            # Ensure proper cleanup
+            if self.worker_link:
+                await self.worker_link.stop()
+            await self.stop_background_tasks(background_tasks)
+            await broadcast_engine.stop()
+            await warm_start.stop()
             try:
                 if 'application' in locals():
-                    await application.stop()
+                    if application.updater and application.updater.running:
+                        await application.updater.stop()
+                    if application.running:
+                        await application.stop()
                     await application.shutdown()
             except Exception as cleanup_error:
                 log_error_to_file(cleanup_error, "Cleanup error")
+            # Saved last, after the pending updates were processed
+            warm_start.save(self.db_manager)
+    
+    def add_handlers(self, application):
+        """Register the handlers of every bot"""
+        # Drop updates already processed before a restart
+        application.add_handler(TypeHandler(Update, warm_start.track_update), group=-3)
+        
+        # Drop commands from flooding users and chats before anything else runs
+        application.add_handler(TypeHandler(Update, flood_control.check_update), group=-2)
+        
+        # Record last activity of every sender before the command handlers run
+        application.add_handler(TypeHandler(Update, activity_tracker.track_update), group=-1)
+        
+        # Add command handlers (with and without prefixes)
+        application.add_handler(CommandHandler("start", start_command))
+        application.add_handler(CommandHandler("info", info_command))
+        application.add_handler(CommandHandler("logs", logs_command))
+        application.add_handler(CommandHandler("commitlogs", commit_logs_command))
+        application.add_handler(CommandHandler("stats", stats_command))
+        application.add_handler(CommandHandler("users", users_command))
+        application.add_handler(CommandHandler("broadcast", broadcast_command))
+        application.add_handler(CommandHandler("history", history_command))
+        application.add_handler(CommandHandler("metrics", metrics_command))
+        application.add_handler(CommandHandler("exportusers", export_users_command))
+        application.add_handler(CommandHandler("profile", profile_command))
+        application.add_handler(CommandHandler("memsnap", memsnap_command))
+        
+        # Add admin commands
+        application.add_handler(CommandHandler("addadmin", admin_commands.add_admin))
+        application.add_handler(CommandHandler("addseller", admin_commands.add_seller))
+        application.add_handler(CommandHandler("addpremium", admin_commands.add_premium))
+        
+        # Add key commands
+        application.add_handler(CommandHandler("generatekey", generate_key_command))
+        application.add_handler(CommandHandler("keys", keys_command))
+        application.add_handler(CommandHandler("redeemkey", redeem_key_command))
+        
+        # Add message handler for prefixed commands
+        application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_prefixed_commands))
+        
+        # Add callback query handlers for buttons
+        application.add_handler(CallbackQueryHandler(users_callback, pattern=r"^users:"))
+        application.add_handler(CallbackQueryHandler(keys_callback, pattern=r"^keys:"))
+        application.add_handler(CallbackQueryHandler(self.button_callback))
+        
+        # Add error handler
+        application.add_error_handler(self.error_handler)
+    
+    async def start_cluster(self, workers: int):
+        """Run the front process of multi-process mode"""
+        if not self.bots:
+            log_error_to_file("BOT_TOKEN environment variable is not set", "Bot initialization")
+            if error_logger:
+                error_logger.log_error("BOT_TOKEN environment variable is not set", "Bot initialization")
+            return
+        
+        try:
+            current_tenant.set(self.bots[0].table_prefix)
+            await self.db_manager.initialize_database()
+            front = ClusterFront(
+                self.bots[0].token, workers, run_worker,
+                socket_path=os.getenv('CLUSTER_SOCKET'),
+                queue_size=int(os.getenv('CLUSTER_QUEUE_SIZE', '10000'))
+            )
+            if error_logger:
+                error_logger.log_info(f"Starting {workers} workers...")
+            self.stop_event = asyncio.Event()
+            self.install_signal_handlers()
+            await front.run(self.stop_event)
+        except Exception as e:
+            log_error_to_file(e, "Cluster startup")
+            if error_logger:
+                error_logger.log_error(e, "Cluster startup")
+            raise e
+        finally:
+            if error_logger:
+                await error_logger.close()
+    
+    def create_persistence(self):
+        """Database backed persistence for the Application"""
+        if self.worker_link:
+            # Group chats and bot_data are shared by every worker, only user-keyed state is safe to write
+            store_data = PersistenceInput(bot_data=False, chat_data=False, callback_data=False)
+        else:
+            store_data = PersistenceInput()
+        return DatabasePersistence(self.db_manager, store_data=store_data, update_interval=self.persistence_interval)
+    
+    def register_metrics(self):
+        """Gauges read from the in-memory state when metrics are rendered"""
+        metrics.gauge_callback('user_cache_entries', lambda: len(user_cache))
+        metrics.gauge_callback('user_cache_hits', lambda: user_cache.hits)
+        metrics.gauge_callback('user_cache_misses', lambda: user_cache.misses)
+        metrics.gauge_callback('flood_throttled', lambda: sum(flood.throttled for flood in flood_control.instances()))
+        metrics.gauge_callback('activity_pending', lambda: len(activity_tracker))
+        metrics.gauge_callback('intake_queued', lambda: sum(len(intake) for intake in update_intake.instances()))
+        for name in shared_request.stats():
+            metrics.gauge_callback(f'http_{name}', lambda name=name: shared_request.stats()[name])
+    
+    def track_memory(self):
+        """Structures whose size the memory watchdog records"""
+        memory_watchdog.track('user_cache', lambda: len(user_cache))
+        memory_watchdog.track('username_cache', lambda: len(username_cache))
+        memory_watchdog.track('rank_index', user_cache.rank_count)
+        memory_watchdog.track('flood_tables', lambda: sum(len(flood.users) + len(flood.chats) for flood in flood_control.instances()))
+        memory_watchdog.track('broadcast_backlog', lambda: sum(engine.backlog() for engine in broadcast_engine.instances()))
+        memory_watchdog.track('media_cache', lambda: sum(len(cache) for cache in media_cache.instances()))
+        memory_watchdog.track('activity_pending', lambda: len(activity_tracker))
+        memory_watchdog.track('audit_pending', lambda: len(audit_log))
+        memory_watchdog.track('intake_queue', lambda: sum(len(intake) for intake in update_intake.instances()))
+    
+    def report_memory_growth(self, text: str):
+        """Send a memory growth alert to the admin log"""
+        # The watchdog already wrote it to the log file, also notify the error chat
+        if error_logger and error_logger.bot and error_logger.error_chat_id:
+            message = f"🧠 *Crecimiento de memoria*\n\n```\n{text[:3500]}\n```"
+            error_logger.notify(message)
+    
+    def report_stall(self, event):
+        """Send an event loop stall to the admin log"""
+        # The watchdog already wrote it to the log file, also notify the error chat
+        if error_logger and error_logger.bot and error_logger.error_chat_id:
+            message = f"🐢 *Bloqueo del bot*\n\n```\n{event.describe()}\n\n{event.stack[-3500:]}\n```"
+            error_logger.notify(message)
+    
+    def install_signal_handlers(self):
+        """Stop the bot on SIGINT/SIGTERM"""
+        loop = asyncio.get_running_loop()
+        # Workers ignore signals, the front drains their updates and tells them to stop
+        handler = (lambda: None) if self.worker_link else self.stop_event.set
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, handler)
+            except (NotImplementedError, RuntimeError):
+                # Not supported on Windows, KeyboardInterrupt still works there
+                pass
+    
+    def start_background_tasks(self) -> list:
+        """Start periodic maintenance jobs of the current bot"""
+        # Every worker keeps its own stats counters and only sees its own writes
+        tasks = [
+            asyncio.create_task(
+                self.run_periodic("Stats reconciliation", self.stats_reconcile_interval, self.db_manager.reconcile_stats)
+            ),
+            # Picks up rank changes made by other workers and expired without a cache entry
+            asyncio.create_task(
+                self.run_periodic("Rank index refresh", self.stats_reconcile_interval, self.db_manager.load_rank_index)
+            ),
+        ]
+        if self.is_primary:
+            tasks.append(asyncio.create_task(
+                self.run_periodic("Rank expiry", self.expiry_check_interval, self.db_manager.expire_users)
+            ))
+        return tasks
+    
+    async def stop_background_tasks(self, tasks: list):
+        """Cancel periodic maintenance jobs"""
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    
+    async def run_periodic(self, name, interval, func):
+        """Run func every interval seconds until cancelled"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await func()
+            except DatabaseUnavailable as e:
+                if error_logger:
+                    error_logger.log_warning(f"{name} skipped, database unavailable: {e}")
+            except Exception as e:
+                log_error_to_file(e, name)
+                if error_logger:
+                    error_logger.log_error(e, name)
     
     async def handle_prefixed_commands(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle commands with prefixes"""
@@ -157,12 +449,58 @@ class RiasGremoryBot:
             await logs_command(update, context)
         elif cmd == "commitlogs":
             await commit_logs_command(update, context)
+        elif cmd == "stats":
+            await stats_command(update, context)
+        elif cmd == "users":
+            await users_command(update, context)
+        elif cmd == "broadcast":
+            await broadcast_command(update, context)
+        elif cmd == "history":
+            await history_command(update, context)
+        elif cmd == "metrics":
+            await metrics_command(update, context)
+        elif cmd == "exportusers":
+            await export_users_command(update, context)
+        elif cmd == "profile":
+            await profile_command(update, context)
+        elif cmd == "memsnap":
+            await memsnap_command(update, context)
         elif cmd == "addadmin":
             await admin_commands.add_admin(update, context)
         elif cmd == "addseller":
             await admin_commands.add_seller(update, context)
         elif cmd == "addpremium":
             await admin_commands.add_premium(update, context)
+        elif cmd == "generatekey":
+            await generate_key_command(update, context)
+        elif cmd == "keys":
+            await keys_command(update, context)
+        elif cmd == "redeemkey":
+            await redeem_key_command(update, context)
+    
+    async def error_handler(self, update: object, context: ContextTypes.DEFAULT_TYPE):
+        """Handle errors raised by handlers"""
+        if isinstance(context.error, DatabaseUnavailable):
+            # Expected during a database outage, answer quickly instead of reporting each failure
+            if error_logger:
+                error_logger.log_warning(f"Database unavailable: {context.error}")
+            if isinstance(update, Update) and update.effective_message:
+                try:
+                    await update.effective_message.reply_text(
+                        "⚠️ *El sistema está en mantenimiento, intenta de nuevo en unos segundos* ⚠️",
+                        parse_mode='Markdown'
+                    )
+                except Exception:
+                    pass
+            return
+        
+        # Re-raise so the loggers see the original traceback
+        try:
+            raise context.error
+        except Exception as e:
+            log_error_to_file(e, "Handler error")
+            if error_logger:
+                error_logger.log_error(e, "Handler error")
     
     async def button_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle button callbacks"""
@@ -183,16 +521,34 @@ async def main():
     """Main function"""
     try:
         bot = RiasGremoryBot()
-        await bot.start()
+        workers = int(os.getenv('BOT_WORKERS', '1'))
+        if workers > 1 and len(bot.bots) > 1:
+            raise ValueError("Multi-process mode supports a single bot, unset BOTS_CONFIG or BOT_WORKERS")
+        if workers > 1:
+            await bot.start_cluster(workers)
+        else:
+            await bot.start()
     except Exception as e:
         log_error_to_file(e, "Main function")
         raise e
 
+def run_worker(worker_index: int, socket_path: str):
+    """Entry point of a worker process in multi-process mode"""
+    try:
+        # Spawned workers start a fresh interpreter, apply the profile again
+        runtime.apply()
+        asyncio.run(RiasGremoryBot(worker_index, socket_path).start())
+    except Exception as e:
+        log_error_to_file(e, f"Worker {worker_index}")
+        raise e
+
 if __name__ == '__main__':
     try:
         # Set up proper event loop handling
         if sys.platform.startswith('win'):
             asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+        # uvloop and orjson with RUNTIME_PROFILE=performance
+        runtime.apply()
         
         asyncio.run(main())
     except KeyboardInterrupt:
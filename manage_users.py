@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Bulk import/export of the users table
+
+    python manage_users.py export users.csv.gz
+    python manage_users.py export users.jsonl --chunk-size 10000
+    python manage_users.py import users.csv.gz --chunk-size 2000
+    python manage_users.py export akeno.csv.gz --table-prefix akeno_
+
+The format comes from the extension (.csv or .jsonl, optionally .gz) unless
+--format is given. An interrupted import continues where it stopped when run
+again with the same file, use --restart to import it from the beginning.
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from dotenv import load_dotenv
+
+def print_progress(label):
+    started = time.monotonic()
+
+    def progress(rows):
+        elapsed = time.monotonic() - started
+        rate = rows / elapsed if elapsed else 0
+        print(f"\r{label}: {rows} usuarios ({rate:.0f}/s)", end="", flush=True)
+    return progress
+
+async def run(args):
+    from database.database import DatabaseManager
+    from database.transfer import export_users, import_users
+    from database.tenant import current_tenant, validate_prefix
+
+    current_tenant.set(validate_prefix(args.table_prefix))
+    db_manager = DatabaseManager()
+    if args.command == 'export':
+        written = await export_users(db_manager, args.path, fmt=args.format,
+                                     chunk_size=args.chunk_size or 5000, progress=print_progress("Exportando"))
+        print(f"\n✅ {written} usuarios exportados a {args.path}")
+    else:
+        await db_manager.initialize_database()
+        imported, skipped = await import_users(db_manager, args.path, fmt=args.format,
+                                               chunk_size=args.chunk_size or 1000, resume=not args.restart,
+                                               progress=print_progress("Importando"))
+        print(f"\n✅ {imported} usuarios importados, {skipped} filas inválidas omitidas")
+        if imported:
+            # Los contadores de /stats viven en la memoria de cada bot en marcha
+            print("ℹ️ Los bots en marcha actualizan /stats y los rangos en la próxima reconciliación (STATS_RECONCILE_INTERVAL)")
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Importar o exportar la tabla users")
+    parser.add_argument('command', choices=['export', 'import'])
+    parser.add_argument('path', help="Archivo .csv o .jsonl, con .gz para comprimir")
+    parser.add_argument('--format', choices=['csv', 'jsonl'], help="Por defecto según la extensión")
+    parser.add_argument('--chunk-size', type=int, help="Filas por lote (export 5000, import 1000)")
+    parser.add_argument('--table-prefix', default='', help="Prefijo de las tablas del bot (ver BOTS_CONFIG)")
+    parser.add_argument('--restart', action='store_true', help="Ignorar el progreso de una importación anterior")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(run(args))
+    except KeyboardInterrupt:
+        print("\n⚠️ Interrumpido, vuelve a ejecutar el mismo comando para continuar")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,622 @@
+#!/usr/bin/env python3
+"""
+Soak test: run the bot for hours and fail if resources or latency drift upward
+
+    python soak.py
+    python soak.py --duration 30 --sample-every 15 --warmup 5
+    python soak.py --rate 100 --db-error-rate 0.05 --csv soak.csv
+
+The bot is started exactly as main.py starts it (handlers, persistence,
+flushers, watchdogs, maintenance jobs), pointed with BOT_API_URL at a local
+fake Bot API and with an in-memory stand-in of MySQL that injects connection
+and query errors. A steady mix of /start, /info, prefixed commands, owner
+grants and button presses is sent, each user waiting for the answer before
+sending again. RSS, open file descriptors, asyncio tasks, threads and latency
+percentiles are sampled; after the warmup none of them may trend upward beyond
+its tolerance and the log files must stay within their rotation limit,
+otherwise the exit status is 1. Logs, snapshot and spill files are written to
+a temporary directory that is kept for inspection. No token or database is
+needed.
+"""
+
+import argparse
+import asyncio
+import csv
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from benchmark import BotAPIServer
+from database.models import OWNER_ID
+
+TOKEN = '123456:soak'
+ERROR_CHAT_ID = -1001
+FIRST_USER_ID = 100000
+LOG_MAX_BYTES = 1024 * 1024
+LOG_BACKUP_COUNT = 2
+MB = 1024 * 1024
+
+# Share of each kind of update in the workload
+WORKLOAD = {'start': 30, 'info': 25, 'prefixed': 20, 'button': 15, 'grant': 10}
+
+# Series checked for an upward trend after the warmup:
+# (series, label, absolute tolerance, tolerance relative to the start value)
+TREND_CHECKS = (
+    ('rss_mb', 'RSS (MB)', 16, 0.10),
+    ('fds', 'Descriptores abiertos', 5, 0),
+    ('tasks', 'Tareas asyncio', 20, 0.25),
+    ('threads', 'Hilos', 2, 0),
+    ('p50_ms', 'Latencia p50 (ms)', 10, 0.50),
+    ('p99_ms', 'Latencia p99 (ms)', 25, 0.50),
+)
+
+class MemoryDatabase:
+    """In-memory stand-in of the MySQL tables the workload touches
+
+    Installed as aiomysql.create_pool, so every query still goes through the
+    DatabaseManager code, its cache and its resilience layer. Statements are
+    recognized by their shape; anything else (DDL, jobs the workload does not
+    drive) succeeds without rows and is counted in `unsupported`. Each
+    statement waits `latency` seconds and, once `error_rate` is set, fails with
+    that probability: mostly as a lost connection, which reads retry and
+    writes turn into DatabaseUnavailable, sometimes as a query error that
+    reaches the error handler and the ErrorLogger.
+    """
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.error_rate = 0
+        # telegram_id -> row as a dict of columns
+        self.users = {}
+        self.persistence = {}
+        self.audit_rows = 0
+        self.next_id = 1
+        self.unsupported = Counter()
+        self.injected = Counter()
+
+    async def create_pool(self, **settings):
+        return MemoryPool(self)
+
+    def add_user(self, telegram_id: int, username: str, first_name: str, last_name: str, rank: str = 'free_user') -> bool:
+        if telegram_id in self.users:
+            return False
+        self.users[telegram_id] = {
+            'id': self.next_id, 'telegram_id': telegram_id, 'username': username, 'first_name': first_name,
+            'last_name': last_name, 'rank': rank, 'created_at': datetime.now(), 'expires_at': None,
+            'is_active': 1, 'last_seen_at': None,
+        }
+        self.next_id += 1
+        return True
+
+    @staticmethod
+    def user_row(user: dict) -> tuple:
+        return (user['id'], user['telegram_id'], user['username'], user['first_name'], user['last_name'],
+                user['rank'], user['created_at'], user['expires_at'], user['is_active'])
+
+    async def wait(self, sql: str):
+        await asyncio.sleep(self.latency)
+        if self.error_rate and random.random() < self.error_rate:
+            import pymysql
+            if random.random() < 0.75:
+                self.injected['connection'] += 1
+                raise pymysql.err.OperationalError(2013, "Lost connection to MySQL server during query (injected)")
+            self.injected['query'] += 1
+            raise pymysql.err.ProgrammingError(1064, "You have an error in your SQL syntax (injected)")
+
+    def run(self, sql: str, params) -> tuple:
+        """Run one statement, returns (rows, rowcount)"""
+        sql = ' '.join(sql.replace('`', '').split())
+        params = tuple(params or ())
+        users = self.users
+
+        if sql.startswith('SELECT id, telegram_id, username'):
+            if ' IN (' in sql:
+                rows = [self.user_row(users[telegram_id]) for telegram_id in params if telegram_id in users]
+            else:
+                rows = [self.user_row(users[params[0]])] if params[0] in users else []
+            return rows, len(rows)
+        if sql.startswith('INSERT IGNORE INTO users'):
+            if len(params) == 1:
+                # The owner row of initialize_database, only the ID is a parameter
+                params = (params[0], 'kenny_kx', 'Issei', 'Owner', 'issei')
+            return [], int(self.add_user(*params[:4], rank=params[4] if len(params) > 4 else 'free_user'))
+        if sql.startswith('SELECT rank, expires_at FROM users WHERE telegram_id'):
+            user = users.get(params[0])
+            return ([(user['rank'], user['expires_at'])] if user else []), 0
+        if sql.startswith('UPDATE users SET rank = %s, expires_at = %s WHERE telegram_id = %s'):
+            user = users.get(params[2])
+            if not user:
+                return [], 0
+            user['rank'], user['expires_at'] = params[0], params[1]
+            return [], 1
+        if sql.startswith("UPDATE users SET rank = 'free_user', expires_at = NULL WHERE telegram_id IN"):
+            expired = [users[telegram_id] for telegram_id in params if telegram_id in users]
+            for user in expired:
+                user['rank'], user['expires_at'] = 'free_user', None
+            return [], len(expired)
+        if sql.startswith('SELECT telegram_id, is_active FROM users WHERE telegram_id IN'):
+            return [(telegram_id, users[telegram_id]['is_active']) for telegram_id in params if telegram_id in users], 0
+        if sql.startswith('SELECT telegram_id FROM users WHERE username_ci'):
+            matches = [user for user in users.values() if (user['username'] or '').lower() == params[0]]
+            matches.sort(key=lambda user: user['last_seen_at'] or datetime.min, reverse=True)
+            return [(matches[0]['telegram_id'],)] if matches else [], 0
+        if sql.startswith('SELECT telegram_id, rank, expires_at FROM users WHERE expires_at IS NOT NULL'):
+            now = datetime.now()
+            return [
+                (user['telegram_id'], user['rank'], user['expires_at']) for user in users.values()
+                if user['expires_at'] and user['expires_at'] <= now and user['rank'] != 'issei'
+            ], 0
+        if sql.startswith("SELECT telegram_id, rank FROM users WHERE rank <> 'free_user'"):
+            return [(user['telegram_id'], user['rank']) for user in users.values() if user['rank'] != 'free_user'], 0
+        if sql.startswith('SELECT rank, COUNT(*) FROM users GROUP BY rank'):
+            return list(Counter(user['rank'] for user in users.values()).items()), 0
+        if sql.startswith('SELECT COUNT(*) FROM users WHERE is_active = 1'):
+            return [(sum(user['is_active'] for user in users.values()),)], 0
+        if sql.startswith('SELECT DATE(expires_at), COUNT(*) FROM users'):
+            now = datetime.now()
+            return list(Counter(
+                user['expires_at'].date() for user in users.values() if user['expires_at'] and user['expires_at'] > now
+            ).items()), 0
+        if sql.startswith('SELECT data FROM bot_persistence'):
+            data = self.persistence.get((params[0], params[1]))
+            return ([(data,)] if data is not None else []), 0
+        if sql.startswith('SELECT data_key, data FROM bot_persistence'):
+            return [(key, data) for (kind, key), data in self.persistence.items() if kind == params[0]], 0
+        if sql.startswith('SELECT id, created_by, target_rank'):
+            # No broadcast to resume
+            return [], 0
+        if sql.startswith('SELECT 1 FROM information_schema'):
+            # Columns and indexes already exist
+            return [(1,)], 1
+        if not sql.startswith(('CREATE', 'ALTER')):
+            self.unsupported[sql[:80]] += 1
+        return [], 0
+
+    def run_many(self, sql: str, rows: list) -> int:
+        """Run a statement for each row, returns the rowcount"""
+        sql = ' '.join(sql.replace('`', '').split())
+        if sql.startswith('INSERT INTO users (telegram_id, username, first_name, last_name, last_seen_at)'):
+            # Affected rows are 1 per insert and 2 per update, as MySQL reports them
+            affected = 0
+            for telegram_id, username, first_name, last_name, last_seen_at in rows:
+                if self.add_user(telegram_id, username, first_name, last_name):
+                    affected += 1
+                else:
+                    affected += 2
+                self.users[telegram_id].update(
+                    username=username, first_name=first_name, last_name=last_name, last_seen_at=last_seen_at, is_active=1
+                )
+            return affected
+        if sql.startswith('INSERT INTO rank_audit'):
+            # Only counted, an ever-growing table would show up as a leak of the bot
+            self.audit_rows += len(rows)
+            return len(rows)
+        if sql.startswith('INSERT INTO bot_persistence'):
+            for kind, key, data in rows:
+                self.persistence[(kind, key)] = data
+            return len(rows)
+        if sql.startswith('DELETE FROM bot_persistence'):
+            return sum(self.persistence.pop(tuple(key), None) is not None for key in rows)
+        return sum(self.run(sql, row)[1] for row in rows)
+
+class MemoryCursor:
+    def __init__(self, db: MemoryDatabase):
+        self.db = db
+        self.rows = []
+        self.rowcount = 0
+
+    async def execute(self, sql: str, params=None):
+        await self.db.wait(sql)
+        self.rows, self.rowcount = self.db.run(sql, params)
+
+    async def executemany(self, sql: str, rows):
+        await self.db.wait(sql)
+        self.rows, self.rowcount = [], self.db.run_many(sql, list(rows))
+
+    async def fetchone(self):
+        return self.rows.pop(0) if self.rows else None
+
+    async def fetchall(self):
+        rows, self.rows = self.rows, []
+        return rows
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+class MemoryConnection:
+    def __init__(self, db: MemoryDatabase):
+        self.db = db
+
+    def cursor(self):
+        return MemoryCursor(self.db)
+
+    async def begin(self):
+        pass
+
+    async def commit(self):
+        pass
+
+    async def rollback(self):
+        pass
+
+class MemoryAcquire:
+    """pool.acquire() of aiomysql, awaitable or used with `async with`"""
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.conn = None
+
+    def __await__(self):
+        return self.pool.take().__await__()
+
+    async def __aenter__(self):
+        self.conn = await self.pool.take()
+        return self.conn
+
+    async def __aexit__(self, *exc):
+        self.pool.release(self.conn)
+
+class MemoryPool:
+    def __init__(self, db: MemoryDatabase):
+        self.db = db
+        self.free = []
+        self.size = 0
+
+    async def take(self) -> MemoryConnection:
+        if self.free:
+            return self.free.pop()
+        self.size += 1
+        return MemoryConnection(self.db)
+
+    def acquire(self) -> MemoryAcquire:
+        return MemoryAcquire(self)
+
+    def release(self, conn: MemoryConnection):
+        self.free.append(conn)
+
+    def close(self):
+        self.free.clear()
+
+    async def wait_closed(self):
+        pass
+
+class SoakBotAPI(BotAPIServer):
+    """Fake Bot API serving the workload and timing the first answer to each update"""
+
+    def __init__(self):
+        self.queue = []
+        self.new_updates = asyncio.Event()
+        self.polling = asyncio.Event()
+        # user id -> (time the update was queued, kind), one update per user at a time
+        self.waiting = {}
+        # callback query id -> user id
+        self.callbacks = {}
+        # Answer times since the last sample, in seconds
+        self.latencies = []
+        self.answered = Counter()
+        self.unanswered = Counter()
+        self.error_reports = 0
+        self.next_update_id = 1
+        self.next_message_id = 1
+
+    def push(self, user_id: int, kind: str, update: dict):
+        update['update_id'] = self.next_update_id
+        self.next_update_id += 1
+        self.queue.append(update)
+        self.waiting[user_id] = (time.perf_counter(), kind)
+        self.new_updates.set()
+
+    def answer_to(self, user_id: int):
+        sent = self.waiting.pop(user_id, None)
+        if sent:
+            self.latencies.append(time.perf_counter() - sent[0])
+            self.answered[sent[1]] += 1
+
+    def expire(self, timeout: float):
+        """Give up on updates without an answer, their users can send again"""
+        now = time.perf_counter()
+        for user_id, (sent_at, kind) in list(self.waiting.items()):
+            if now - sent_at > timeout:
+                del self.waiting[user_id]
+                self.unanswered[kind] += 1
+
+    async def answer(self, method: str, params: dict) -> bytes:
+        if method == 'getMe':
+            return self.ok({'id': 123456, 'is_bot': True, 'first_name': 'Soak', 'username': 'soak_bot'})
+        if method == 'getUpdates':
+            self.polling.set()
+            if not self.queue:
+                self.new_updates.clear()
+                try:
+                    await asyncio.wait_for(self.new_updates.wait(), min(float(params.get('timeout', 0)), 5))
+                except asyncio.TimeoutError:
+                    pass
+            limit = int(params.get('limit', 100))
+            batch, self.queue = self.queue[:limit], self.queue[limit:]
+            return self.ok(batch)
+        if method == 'answerCallbackQuery':
+            user_id = self.callbacks.pop(params.get('callback_query_id'), None)
+            if user_id:
+                self.answer_to(user_id)
+            return self.ok(True)
+        if method.startswith(('send', 'edit')):
+            chat_id = int(params.get('chat_id', 0))
+            if chat_id == ERROR_CHAT_ID:
+                self.error_reports += 1
+            else:
+                self.answer_to(chat_id)
+            message = self.message(self.next_message_id, chat_id)
+            self.next_message_id += 1
+            if method == 'sendPhoto':
+                message['photo'] = [{'file_id': 'soak-photo', 'file_unique_id': 'soak-photo', 'width': 400, 'height': 600}]
+            return self.ok(message)
+        return self.ok(True)
+
+def sender(user_id: int) -> dict:
+    return {'id': user_id, 'is_bot': False, 'first_name': f'Soak{user_id}', 'username': f'soak{user_id}'}
+
+def message_update(user_id: int, text: str) -> dict:
+    message = {
+        'message_id': random.randint(1, 2 ** 31), 'date': int(time.time()), 'from': sender(user_id),
+        'chat': {'id': user_id, 'type': 'private', 'first_name': f'Soak{user_id}'}, 'text': text,
+    }
+    if text.startswith('/'):
+        message['entities'] = [{'type': 'bot_command', 'offset': 0, 'length': len(text.split()[0])}]
+    return {'message': message}
+
+class Workload:
+    """Next update of the mix, from a user that is not waiting for an answer"""
+
+    def __init__(self, api: SoakBotAPI, users: int):
+        from config.prefixes import COMMAND_PREFIXES
+        self.api = api
+        self.users = users
+        self.prefixes = COMMAND_PREFIXES
+        self.kinds = list(WORKLOAD)
+        self.weights = list(WORKLOAD.values())
+        self.skipped = 0
+
+    def idle_user(self):
+        for _ in range(10):
+            user_id = FIRST_USER_ID + random.randrange(self.users)
+            if user_id not in self.api.waiting:
+                return user_id
+        return None
+
+    def send_next(self):
+        kind = random.choices(self.kinds, self.weights)[0]
+        if kind == 'grant' and OWNER_ID in self.api.waiting:
+            kind = 'info'
+        user_id = OWNER_ID if kind == 'grant' else self.idle_user()
+        if user_id is None:
+            # Every user picked is still waiting, the bot is behind
+            self.skipped += 1
+            return
+
+        if kind == 'start':
+            update = message_update(user_id, '/start')
+        elif kind == 'info':
+            update = message_update(user_id, '/info')
+        elif kind == 'prefixed':
+            update = message_update(user_id, f"{random.choice(self.prefixes)}{random.choice(('start', 'info'))}")
+        elif kind == 'grant':
+            target = FIRST_USER_ID + random.randrange(self.users)
+            target = f"@soak{target}" if random.random() < 0.5 else str(target)
+            update = message_update(user_id, f"/addpremium {target} 30")
+        else:
+            query_id = f"{user_id}:{self.api.next_update_id}"
+            self.api.callbacks[query_id] = user_id
+            update = {'callback_query': {
+                'id': query_id, 'from': sender(user_id), 'chat_instance': str(user_id), 'data': 'kenny_kx',
+                'message': {
+                    'message_id': 1, 'date': int(time.time()), 'text': 'menu',
+                    'chat': {'id': user_id, 'type': 'private', 'first_name': f'Soak{user_id}'},
+                    'from': {'id': 123456, 'is_bot': True, 'first_name': 'Soak', 'username': 'soak_bot'},
+                },
+            }}
+        self.api.push(user_id, kind, update)
+
+def open_fds():
+    for path in ('/proc/self/fd', '/dev/fd'):
+        try:
+            return len(os.listdir(path))
+        except OSError:
+            continue
+    return None
+
+def log_bytes(workdir: str) -> int:
+    total = 0
+    for root, _, files in os.walk(workdir):
+        total += sum(os.path.getsize(os.path.join(root, name)) for name in files if '.log' in name or '.txt' in name)
+    return total
+
+def trend(samples: list, series: str):
+    """(start value, growth over the run) from a least squares fit"""
+    points = [(sample['minute'], sample[series]) for sample in samples if sample[series] is not None]
+    if len(points) < 3:
+        return None, None
+    xs, ys = zip(*points)
+    mean_x, mean_y = statistics.fmean(xs), statistics.fmean(ys)
+    variance = sum((x - mean_x) ** 2 for x in xs)
+    slope = sum((x - mean_x) * (y - mean_y) for x, y in points) / variance if variance else 0
+    return statistics.median(ys[:3]), slope * (xs[-1] - xs[0])
+
+async def soak(args) -> int:
+    workdir = tempfile.mkdtemp(prefix='rias-soak-')
+    api = SoakBotAPI()
+    port = await api.start()
+    os.environ.update({
+        'BOT_TOKEN': TOKEN, 'BOTS_CONFIG': '', 'BOT_WORKERS': '1', 'BOT_API_URL': f"http://127.0.0.1:{port}",
+        'ERROR_CHAT_ID': str(ERROR_CHAT_ID), 'METRICS_PORT': '0', 'MEMORY_TRACEMALLOC': '0',
+        'DB_HOST': 'soak', 'DB_NAME': 'soak', 'DB_USER': 'soak', 'DB_PASSWORD': 'soak', 'DB_REPLICA_DSN': '',
+        'LOG_MAX_BYTES': str(LOG_MAX_BYTES), 'LOG_BACKUP_COUNT': str(LOG_BACKUP_COUNT),
+    })
+    # Maintenance jobs run several times per sample instead of a few times per run
+    for name, value in (('ACTIVITY_FLUSH_INTERVAL', '5'), ('PERSISTENCE_UPDATE_INTERVAL', '10'),
+                        ('EXPIRY_CHECK_INTERVAL', '30'), ('STATS_RECONCILE_INTERVAL', '60')):
+        os.environ.setdefault(name, value)
+    # Log files, the warm start snapshot and spilled records stay out of the repository
+    os.chdir(workdir)
+
+    import aiomysql
+    db = MemoryDatabase(args.db_latency / 1000)
+    aiomysql.create_pool = db.create_pool
+
+    import main
+    from utils.memory import current_rss
+    # The sample table goes to the console, the bot logs only to its files
+    bot_logger = logging.getLogger('RiasBot')
+    for handler in list(bot_logger.handlers):
+        if type(handler) is logging.StreamHandler:
+            bot_logger.removeHandler(handler)
+    bot = main.RiasGremoryBot()
+    bot_task = asyncio.create_task(bot.start())
+    polling = asyncio.create_task(api.polling.wait())
+    await asyncio.wait((bot_task, polling), return_when=asyncio.FIRST_COMPLETED)
+    if bot_task.done():
+        bot_task.result()
+        print("❌ El bot se detuvo al iniciar")
+        return 1
+    db.error_rate = args.db_error_rate
+
+    print(f"🧪 Soak de {args.duration:g} minutos a {args.rate:g} actualizaciones/s con {args.users} usuarios, "
+          f"{args.db_error_rate:.1%} de errores de base de datos")
+    print(f"📁 Archivos del bot en {workdir}\n")
+    columns = ('minute', 'updates_s', 'p50_ms', 'p99_ms', 'rss_mb', 'fds', 'tasks', 'threads', 'log_mb', 'unanswered')
+    print(f"{'min':>7} {'upd/s':>7} {'p50 ms':>8} {'p99 ms':>8} {'RSS MB':>8} {'fds':>5} {'tareas':>7} "
+          f"{'hilos':>6} {'logs MB':>8} {'sin resp':>9}")
+
+    workload = Workload(api, args.users)
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    ends_at = started + args.duration * 60
+    next_send = next_sample = next_expire = started
+    last_answered = 0
+    samples = []
+    while loop.time() < ends_at and not bot_task.done():
+        now = loop.time()
+        # Catch up in bursts when the loop falls behind, like real traffic does
+        while next_send <= now:
+            workload.send_next()
+            next_send += 1 / args.rate
+        if now >= next_expire:
+            api.expire(args.answer_timeout)
+            next_expire = now + 1
+        if now >= next_sample and now > started:
+            latencies = sorted(api.latencies)
+            api.latencies = []
+            answered = sum(api.answered.values())
+            sample = {
+                'minute': (now - started) / 60,
+                'updates_s': (answered - last_answered) / args.sample_every if samples else 0,
+                'p50_ms': latencies[len(latencies) // 2] * 1000 if latencies else None,
+                'p99_ms': latencies[max(int(len(latencies) * 0.99) - 1, 0)] * 1000 if latencies else None,
+                'rss_mb': current_rss() / MB,
+                'fds': open_fds(),
+                'tasks': len(asyncio.all_tasks()),
+                'threads': threading.active_count(),
+                'log_mb': log_bytes(workdir) / MB,
+                'unanswered': sum(api.unanswered.values()),
+            }
+            last_answered = answered
+            samples.append(sample)
+            print(" ".join(
+                f"{'-' if sample[name] is None else format(sample[name], '.1f' if isinstance(sample[name], float) else 'd'):>{width}}"
+                for name, width in zip(columns, (7, 7, 8, 8, 8, 5, 7, 6, 8, 9))
+            ))
+            next_sample = now + args.sample_every
+        await asyncio.sleep(min(next_send, next_sample, next_expire) - loop.time())
+
+    bot.stop_event.set()
+    await bot_task
+    # Release a getUpdates still waiting for updates before closing the server
+    api.new_updates.set()
+    await asyncio.sleep(0.1)
+    api.close()
+
+    if args.csv:
+        with open(args.csv, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=columns)
+            writer.writeheader()
+            writer.writerows(samples)
+
+    print()
+    print(f"Respondidas: {dict(api.answered)}")
+    print(f"Sin respuesta en {args.answer_timeout:g}s: {dict(api.unanswered) or 0}")
+    print(f"Errores de base de datos inyectados: {dict(db.injected) or 0}, reportes al chat de errores: {api.error_reports}")
+    if workload.skipped:
+        print(f"⚠️ {workload.skipped} envíos omitidos, todos los usuarios elegidos esperaban respuesta")
+    for statement, count in db.unsupported.most_common(5):
+        print(f"⚠️ Sentencia no simulada ({count}x): {statement}")
+
+    warmup = min(args.warmup, args.duration / 4)
+    steady = [sample for sample in samples if sample['minute'] >= warmup]
+    if len(steady) < 3:
+        print(f"\n❌ Solo {len(steady)} muestras después del calentamiento, se necesitan al menos 3")
+        return 2
+
+    failed = False
+    print(f"\nTendencia desde el minuto {warmup:g} ({len(steady)} muestras):")
+    print(f"{'Serie':<24} {'inicio':>9} {'tendencia':>10} {'tolerancia':>11}")
+    for series, label, absolute, relative in TREND_CHECKS:
+        start, growth = trend(steady, series)
+        if start is None:
+            print(f"{label:<24} {'sin datos':>9}")
+            continue
+        tolerance = max(absolute, relative * abs(start)) * args.tolerance
+        ok = growth <= tolerance
+        failed |= not ok
+        print(f"{label:<24} {start:>9.1f} {growth:>+10.1f} {tolerance:>11.1f}  {'✅' if ok else '❌'}")
+
+    # Two rotated logs of the ErrorLogger, each with its backups, plus github_errors.txt headroom
+    log_limit = 2 * (LOG_BACKUP_COUNT + 1) * LOG_MAX_BYTES / MB * 1.1
+    final_logs = samples[-1]['log_mb']
+    ok = final_logs <= log_limit
+    failed |= not ok
+    print(f"{'Logs (MB)':<24} {final_logs:>9.1f} {'':>10} {log_limit:>11.1f}  {'✅' if ok else '❌'}")
+
+    unanswered = sum(api.unanswered.values())
+    total = unanswered + sum(api.answered.values())
+    if total and unanswered / total > args.max_unanswered:
+        failed = True
+        print(f"❌ {unanswered / total:.1%} de actualizaciones sin respuesta (máximo {args.max_unanswered:.1%})")
+
+    print(f"\n{'❌ Soak fallido' if failed else '✅ Soak superado'}")
+    return 1 if failed else 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Ejecutar el bot durante horas y detectar fugas y degradación")
+    parser.add_argument('--duration', type=float, default=120, help="Minutos de prueba (por defecto 120)")
+    parser.add_argument('--rate', type=float, default=50, help="Actualizaciones por segundo (por defecto 50)")
+    parser.add_argument('--users', type=int, default=2000, help="Usuarios distintos (por defecto 2000)")
+    parser.add_argument('--sample-every', type=float, default=60, help="Segundos entre muestras (por defecto 60)")
+    parser.add_argument('--warmup', type=float, default=10,
+                        help="Minutos iniciales fuera del análisis, como máximo un cuarto de la prueba (por defecto 10)")
+    parser.add_argument('--db-latency', type=float, default=2, help="Milisegundos por consulta (por defecto 2)")
+    parser.add_argument('--db-error-rate', type=float, default=0.01,
+                        help="Fracción de consultas que fallan tras el arranque (por defecto 0.01)")
+    parser.add_argument('--answer-timeout', type=float, default=15,
+                        help="Segundos tras los que una actualización cuenta como sin respuesta (por defecto 15)")
+    parser.add_argument('--max-unanswered', type=float, default=0.05,
+                        help="Fracción máxima de actualizaciones sin respuesta (por defecto 0.05)")
+    parser.add_argument('--tolerance', type=float, default=1.0, help="Multiplicador de las tolerancias (por defecto 1)")
+    parser.add_argument('--csv', help="Guardar las muestras en este archivo CSV")
+    args = parser.parse_args()
+    if args.csv:
+        args.csv = os.path.abspath(args.csv)
+
+    from utils.runtime import runtime
+    runtime.apply()
+    sys.exit(asyncio.run(soak(args)))
+
+if __name__ == '__main__':
+    main()
@@ -45,12 +45,16 @@ def main():
     
     # Check environment
     bot_token = os.getenv('BOT_TOKEN')
-    if not bot_token:
+    bots_config = os.getenv('BOTS_CONFIG')
+    if not bot_token and not bots_config:
         log_error("CRITICAL ERROR: BOT_TOKEN not found in environment variables")
         print("❌ BOT_TOKEN not found!")
         return
     
-    print(f"✅ BOT_TOKEN found: {bot_token[:10]}...")
+    if bots_config:
+        print(f"✅ BOTS_CONFIG found: {bots_config}")
+    else:
+        print(f"✅ BOT_TOKEN found: {bot_token[:10]}...")
     
     # Check database variables
     db_vars = ['DB_HOST', 'DB_NAME', 'DB_USER', 'DB_PASSWORD']
@@ -77,6 +81,9 @@ def main():
         # Set up proper event loop handling
         if sys.platform.startswith('win'):
             asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+        # uvloop and orjson with RUNTIME_PROFILE=performance
+        main.runtime.apply()
+        print(f"⚡ Perfil de ejecución: {main.runtime.describe()}")
         
         try:
             asyncio.run(main.main())
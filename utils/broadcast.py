@@ -0,0 +1,219 @@
+import asyncio
+import logging
+import os
+from collections import deque
+from contextlib import aclosing
+from telegram.error import Forbidden, RetryAfter, NetworkError, TelegramError
+from utils.cluster import worker_count
+from utils.ratelimit import TokenBucket
+
+logger = logging.getLogger('RiasBot')
+
+class BroadcastJob:
+    """Progress of one broadcast being sent"""
+
+    def __init__(self, broadcast_id: int, created_by: int, target_rank: str, text: str,
+                 last_id: int = 0, sent: int = 0, failed: int = 0, blocked: int = 0):
+        self.broadcast_id = broadcast_id
+        self.created_by = created_by
+        self.target_rank = target_rank
+        self.text = text
+        # Every recipient with users.id <= last_id has been handled
+        self.last_id = last_id
+        self.sent = sent
+        self.failed = failed
+        self.blocked = blocked
+        self.skip_ids = set()
+        self.task = None
+        self.lock = asyncio.Lock()
+        # Row ids dispatched to workers, in id order, and the ones already finished
+        self._pending_ids = deque()
+        self._done_ids = set()
+        # Outcomes not yet written to the database
+        self.results = []
+        self.blocked_ids = []
+
+    def dispatch(self, row_id: int):
+        self._pending_ids.append(row_id)
+
+    def record(self, row_id: int, telegram_id: int, status: str, error: str = None):
+        """Store the outcome for a recipient and advance the checkpoint watermark"""
+        self._done_ids.add(row_id)
+        while self._pending_ids and self._pending_ids[0] in self._done_ids:
+            self.last_id = self._pending_ids.popleft()
+            self._done_ids.discard(self.last_id)
+
+        if status is None:
+            return
+        self.results.append((self.broadcast_id, telegram_id, status, error[:255] if error else None))
+        if status == 'sent':
+            self.sent += 1
+        elif status == 'blocked':
+            self.blocked += 1
+            self.blocked_ids.append(telegram_id)
+        else:
+            self.failed += 1
+
+class BroadcastEngine:
+    """Sends broadcasts through a rate limited worker pool with resumable checkpoints"""
+
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+        # Telegram allows ~30 messages/second per bot, keep headroom for interactive replies.
+        # Broadcasts of different workers run at the same time, each gets its share
+        rate = float(os.getenv('BROADCAST_RATE', '25')) / worker_count()
+        self.bucket = TokenBucket(rate, max(rate, 1))
+        self.workers = int(os.getenv('BROADCAST_WORKERS', '8'))
+        self.checkpoint_every = int(os.getenv('BROADCAST_CHECKPOINT_EVERY', '200'))
+        self.max_attempts = 3
+        self.jobs = {}
+
+    async def create(self, bot, created_by: int, target_rank: str, text: str) -> int:
+        """Register a new broadcast and start sending it"""
+        broadcast_id = await self.db_manager.create_broadcast(created_by, target_rank, text)
+        self._start(bot, BroadcastJob(broadcast_id, created_by, target_rank, text))
+        return broadcast_id
+
+    async def resume(self, bot):
+        """Resume broadcasts interrupted by a restart"""
+        for broadcast_id, created_by, target_rank, text, last_id, sent, failed, blocked in await self.db_manager.get_running_broadcasts():
+            job = BroadcastJob(broadcast_id, created_by, target_rank, text, last_id, sent, failed, blocked)
+            # Recipients already recorded beyond the watermark must not get the message twice
+            job.skip_ids = await self.db_manager.get_broadcast_recipients_after(broadcast_id, last_id)
+            self._start(bot, job)
+            logger.info(f"Resuming broadcast #{broadcast_id} from user id {last_id}")
+
+    async def cancel(self, broadcast_id: int) -> bool:
+        """Stop a running broadcast for good"""
+        job = self.jobs.get(broadcast_id)
+        if not job:
+            return False
+        job.task.cancel()
+        await asyncio.gather(job.task, return_exceptions=True)
+        await self.db_manager.finish_broadcast(broadcast_id, 'cancelled')
+        return True
+
+    async def stop(self):
+        """Checkpoint and stop all broadcasts, they are resumed on next start"""
+        tasks = [job.task for job in self.jobs.values()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def backlog(self) -> int:
+        """Recipients in flight and outcomes waiting for the next checkpoint"""
+        return sum(len(job._pending_ids) + len(job.results) for job in self.jobs.values())
+
+    def _start(self, bot, job: BroadcastJob):
+        job.task = asyncio.create_task(self._run(bot, job))
+        self.jobs[job.broadcast_id] = job
+
+    async def _run(self, bot, job: BroadcastJob):
+        try:
+            await self._send_all(bot, job)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Nobody awaits this task, the error would otherwise vanish with it
+            logger.error(f"Broadcast #{job.broadcast_id} failed: {e}")
+            try:
+                await self.db_manager.finish_broadcast(job.broadcast_id, 'failed')
+            except Exception as finish_error:
+                # Still 'running', it is resumed from the last checkpoint on the next start
+                logger.error(f"Could not mark broadcast #{job.broadcast_id} as failed, it will be resumed: {finish_error}")
+            await self._notify(bot, job, f"❌ *Difusión #{job.broadcast_id} interrumpida por un error*")
+            return
+
+        try:
+            await self.db_manager.finish_broadcast(job.broadcast_id, 'done')
+        except Exception as e:
+            # Every recipient is checkpointed, resuming it finds nobody left and finishes it
+            logger.error(f"Could not mark broadcast #{job.broadcast_id} as done, it will be resumed: {e}")
+        logger.info(f"Broadcast #{job.broadcast_id} finished: {job.sent} sent, {job.blocked} blocked, {job.failed} failed")
+        await self._notify(bot, job, f"📢 *Difusión #{job.broadcast_id} completada*")
+
+    async def _send_all(self, bot, job: BroadcastJob):
+        """Send the broadcast to every recipient left and checkpoint the outcome"""
+        queue = asyncio.Queue(maxsize=self.workers * 2)
+        workers = [asyncio.create_task(self._worker(bot, job, queue)) for _ in range(self.workers)]
+        try:
+            recipients = self.db_manager.stream_broadcast_recipients(job.target_rank, job.last_id)
+            async with aclosing(recipients):
+                async for row_id, telegram_id in recipients:
+                    job.dispatch(row_id)
+                    if telegram_id in job.skip_ids:
+                        job.record(row_id, telegram_id, None)
+                        continue
+                    await queue.put((row_id, telegram_id))
+            await queue.join()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            try:
+                await self._checkpoint(job)
+            finally:
+                self.jobs.pop(job.broadcast_id, None)
+
+    @staticmethod
+    async def _notify(bot, job: BroadcastJob, title: str):
+        """Tell the creator how the broadcast ended"""
+        try:
+            await bot.send_message(
+                chat_id=job.created_by,
+                text=f"{title}\n\n"
+                     f"✅ *Enviados:* {job.sent}\n"
+                     f"🚫 *Bloqueados:* {job.blocked}\n"
+                     f"❌ *Fallidos:* {job.failed}",
+                parse_mode='Markdown'
+            )
+        except TelegramError as e:
+            logger.warning(f"Could not notify broadcast #{job.broadcast_id} creator: {e}")
+
+    async def _worker(self, bot, job: BroadcastJob, queue: asyncio.Queue):
+        while True:
+            row_id, telegram_id = await queue.get()
+            try:
+                status, error = await self._send(bot, telegram_id, job.text)
+                job.record(row_id, telegram_id, status, error)
+                if len(job.results) >= self.checkpoint_every:
+                    await self._checkpoint(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Broadcast #{job.broadcast_id} worker error: {e}")
+            finally:
+                queue.task_done()
+
+    async def _send(self, bot, telegram_id: int, text: str):
+        """Send one message, returns (status, error)"""
+        error = None
+        for attempt in range(self.max_attempts):
+            await self.bucket.acquire()
+            try:
+                await bot.send_message(chat_id=telegram_id, text=text)
+                return 'sent', None
+            except RetryAfter as e:
+                # Flood limit hit, hold every worker back
+                self.bucket.pause(e.retry_after)
+                error = e
+            except Forbidden as e:
+                return 'blocked', str(e)
+            except NetworkError as e:
+                error = e
+                await asyncio.sleep(attempt + 1)
+            except TelegramError as e:
+                return 'failed', str(e)
+        return 'failed', str(error)
+
+    async def _checkpoint(self, job: BroadcastJob):
+        """Persist outcomes and the watermark in one transaction"""
+        async with job.lock:
+            results, job.results = job.results, []
+            blocked_ids, job.blocked_ids = job.blocked_ids, []
+            try:
+                await self.db_manager.save_broadcast_checkpoint(job.broadcast_id, job.last_id, results, blocked_ids)
+            except Exception:
+                job.results = results + job.results
+                job.blocked_ids = blocked_ids + job.blocked_ids
+                raise
@@ -0,0 +1,218 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+from telegram import Bot, Update
+from telegram.ext import Updater
+from database.cache import user_cache
+from utils.http import shared_request, create_updates_request, bot_api_urls
+from utils.runtime import runtime
+
+logger = logging.getLogger('RiasBot')
+
+# Frames are JSON lines, updates with big captions or entities can be long
+FRAME_LIMIT = 4 * 1024 * 1024
+
+# Seconds the front waits on stop for fetched updates to reach their workers
+DRAIN_TIMEOUT = 30
+
+def worker_count() -> int:
+    """Processes sharing the bot, limits kept in each process are split among them"""
+    return max(int(os.getenv('BOT_WORKERS', '1')), 1)
+
+def shard_for(update: Update, workers: int) -> int:
+    """Pick the worker of an update, the same user always lands on the same worker"""
+    if update.effective_user:
+        key = update.effective_user.id
+    elif update.effective_chat:
+        key = update.effective_chat.id
+    else:
+        key = update.update_id
+    return key % workers
+
+def encode_frame(op: str, **fields) -> bytes:
+    # Every update goes through here and decode_frame, orjson with the performance profile
+    return runtime.dumps({'op': op, **fields}) + b"\n"
+
+def decode_frame(line: bytes) -> dict:
+    return runtime.loads(line)
+
+class ClusterFront:
+    """Polls Telegram and routes every update to one of N worker processes
+
+    Workers connect to a Unix socket and receive their updates as JSON lines,
+    in the order they were fetched. The same socket is the cache invalidation
+    bus: a worker that changes a user sends its id and the front relays it to
+    every other worker. Dead workers are restarted, updates routed to them in
+    the meantime wait in their queue.
+    """
+
+    def __init__(self, bot_token: str, workers: int, worker_target, socket_path: str = None,
+                 queue_size: int = 10000):
+        self.bot_token = bot_token
+        self.workers = workers
+        self.worker_target = worker_target
+        self.socket_path = socket_path or f"/tmp/rias-bot-{os.getpid()}.sock"
+        self.queues = [asyncio.Queue(maxsize=queue_size) for _ in range(workers)]
+        self.writers = [None] * workers
+        self.processes = [None] * workers
+        self.context = multiprocessing.get_context('spawn')
+        self.routed = 0
+
+    def spawn(self, index: int):
+        process = self.context.Process(
+            target=self.worker_target, args=(index, self.socket_path),
+            name=f"rias-worker-{index}", daemon=False
+        )
+        process.start()
+        self.processes[index] = process
+        logger.info(f"Started worker {index} (pid {process.pid})")
+
+    async def run(self, stop_event: asyncio.Event):
+        """Route updates until stop_event is set, then drain and stop the workers"""
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        server = await asyncio.start_unix_server(self.handle_worker, self.socket_path, limit=FRAME_LIMIT)
+        for index in range(self.workers):
+            self.spawn(index)
+
+        updater = Updater(Bot(self.bot_token, request=shared_request, get_updates_request=create_updates_request(), **bot_api_urls()), asyncio.Queue())
+        await updater.initialize()
+        await updater.start_polling(allowed_updates=Update.ALL_TYPES)
+        router = asyncio.create_task(self.route(updater.update_queue))
+        supervisor = asyncio.create_task(self.supervise())
+        try:
+            await stop_event.wait()
+        finally:
+            await updater.stop()
+            await updater.shutdown()
+            # Hand every fetched update to its worker before asking them to stop,
+            # a stuck worker must not keep the front from stopping
+            try:
+                await asyncio.wait_for(self.drain(updater.update_queue), DRAIN_TIMEOUT)
+            except asyncio.TimeoutError:
+                logger.warning(f"{updater.update_queue.qsize()} fetched updates not routed in {DRAIN_TIMEOUT}s, dropping them")
+            router.cancel()
+            supervisor.cancel()
+            await asyncio.gather(router, supervisor, return_exceptions=True)
+            await self.stop_workers()
+            server.close()
+            await server.wait_closed()
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+
+    @staticmethod
+    async def drain(update_queue: asyncio.Queue):
+        while not update_queue.empty():
+            await asyncio.sleep(0.1)
+
+    async def route(self, update_queue: asyncio.Queue):
+        while True:
+            update = await update_queue.get()
+            frame = encode_frame('update', data=update.to_dict())
+            # Blocks when a worker falls behind, so memory stays bounded
+            await self.queues[shard_for(update, self.workers)].put(frame)
+            self.routed += 1
+
+    async def supervise(self):
+        """Restart workers that died"""
+        while True:
+            await asyncio.sleep(1)
+            for index, process in enumerate(self.processes):
+                if process and not process.is_alive():
+                    logger.error(f"Worker {index} exited with code {process.exitcode}, restarting")
+                    self.spawn(index)
+
+    async def stop_workers(self, timeout: float = 30):
+        for index in range(self.workers):
+            try:
+                await asyncio.wait_for(self.queues[index].put(encode_frame('stop')), timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"Worker {index} is not reading its updates, dropping {self.queues[index].qsize()}")
+        loop = asyncio.get_running_loop()
+        for index, process in enumerate(self.processes):
+            if not process:
+                continue
+            await loop.run_in_executor(None, process.join, timeout)
+            if process.is_alive():
+                logger.warning(f"Worker {index} did not stop in {timeout}s, terminating")
+                process.terminate()
+
+    async def handle_worker(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve one worker connection: send its updates, relay its invalidations"""
+        hello = decode_frame(await reader.readline())
+        index = hello['worker']
+        self.writers[index] = writer
+        sender = asyncio.create_task(self.send_updates(index, writer))
+        try:
+            while line := await reader.readline():
+                message = decode_frame(line)
+                if message['op'] == 'invalidate':
+                    frame = encode_frame('invalidate', telegram_id=message['telegram_id'])
+                    for other, other_writer in enumerate(self.writers):
+                        if other != index and other_writer:
+                            # A disconnected worker restarts with an empty cache anyway
+                            other_writer.write(frame)
+        except (ConnectionError, ValueError) as e:
+            logger.warning(f"Worker {index} connection error: {e}")
+        finally:
+            if self.writers[index] is writer:
+                self.writers[index] = None
+            sender.cancel()
+            await asyncio.gather(sender, return_exceptions=True)
+            writer.close()
+
+    async def send_updates(self, index: int, writer: asyncio.StreamWriter):
+        queue = self.queues[index]
+        while True:
+            frame = await queue.get()
+            writer.write(frame)
+            await writer.drain()
+
+class WorkerLink:
+    """Connection of a worker process to the front"""
+
+    def __init__(self, index: int, socket_path: str):
+        self.index = index
+        self.socket_path = socket_path
+        self.writer = None
+        self._task = None
+
+    async def start(self, application, stop_event: asyncio.Event):
+        """Connect to the front and feed received updates into the application"""
+        reader, self.writer = await asyncio.open_unix_connection(self.socket_path, limit=FRAME_LIMIT)
+        self.writer.write(encode_frame('hello', worker=self.index))
+        await self.writer.drain()
+        user_cache.add_listener(self.publish)
+        self._task = asyncio.create_task(self._run(reader, application, stop_event))
+
+    def publish(self, telegram_id: int):
+        """Ask the front to drop this user from the other workers' caches"""
+        if self.writer and not self.writer.is_closing():
+            self.writer.write(encode_frame('invalidate', telegram_id=telegram_id))
+
+    async def _run(self, reader: asyncio.StreamReader, application, stop_event: asyncio.Event):
+        try:
+            while line := await reader.readline():
+                message = decode_frame(line)
+                op = message['op']
+                if op == 'update':
+                    await application.update_queue.put(Update.de_json(message['data'], application.bot))
+                elif op == 'invalidate':
+                    user_cache.invalidate(message['telegram_id'], publish=False)
+                elif op == 'stop':
+                    break
+        except (ConnectionError, ValueError) as e:
+            logger.error(f"Worker {self.index} lost the front: {e}")
+        finally:
+            # Updates already queued are still processed by application.stop()
+            stop_event.set()
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self.writer:
+            self.writer.close()
+            self.writer = None
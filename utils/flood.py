@@ -0,0 +1,153 @@
+import os
+import time
+from collections import OrderedDict
+from telegram import Update
+from telegram.ext import ApplicationHandlerStop, ContextTypes
+from config.flood import get_flood_limits, get_chat_flood_limit
+from config.prefixes import is_valid_prefix
+from database.cache import user_cache
+from database.models import Rank
+from database.tenant import TenantLocal
+from utils.cluster import worker_count
+from utils.ratelimit import TokenBucket
+
+class FloodEntry:
+    """Token bucket of one user or chat and whether it was already warned"""
+    __slots__ = ('bucket', 'limit', 'notified')
+
+    def __init__(self, limit):
+        self.bucket = TokenBucket(*limit)
+        self.limit = limit
+        self.notified = False
+
+class BucketTable:
+    """Bounded LRU of FloodEntry objects
+
+    A bucket idle for longer than it takes to refill completely is full again,
+    so dropping it loses nothing. Idle entries are evicted from the LRU end as
+    new ones are touched, and the table never exceeds `max_entries`.
+    """
+
+    def __init__(self, max_entries: int, idle_ttl: float):
+        self.max_entries = max_entries
+        self.idle_ttl = idle_ttl
+        self._entries = OrderedDict()
+
+    def get(self, key, limit) -> FloodEntry:
+        entry = self._entries.get(key)
+        if entry is None or entry.limit != limit:
+            entry = FloodEntry(limit)
+            self._entries[key] = entry
+        self._entries.move_to_end(key)
+        self._evict()
+        return entry
+
+    def _evict(self):
+        now = time.monotonic()
+        # Amortized O(1): each access drops at most a couple of idle entries
+        for _ in range(2):
+            if not self._entries:
+                break
+            oldest = next(iter(self._entries.values()))
+            if now - oldest.bucket.updated_at <= self.idle_ttl:
+                break
+            self._entries.popitem(last=False)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def items(self):
+        return self._entries.items()
+
+    def export(self) -> list:
+        """Buckets that are not full, as [key, rate, burst, tokens]"""
+        state = []
+        for key, entry in self._entries.items():
+            tokens = entry.bucket.available()
+            if tokens < entry.bucket.capacity:
+                state.append([key, *entry.limit, tokens])
+        return state
+
+    def restore(self, state: list, age: float):
+        """Load exported buckets, `age` seconds after they were exported"""
+        now = time.monotonic()
+        for key, rate, burst, tokens in state:
+            entry = FloodEntry((rate, burst))
+            entry.bucket.tokens = tokens
+            # Refills over the downtime as if the process never stopped
+            entry.bucket.updated_at = now - age
+            self._entries[key] = entry
+        self._evict()
+
+    def __len__(self):
+        return len(self._entries)
+
+class FloodControl:
+    """Drops commands of users and chats that exceed their rate before any handler runs"""
+
+    def __init__(self, max_entries: int = 50000):
+        self.user_limits = get_flood_limits()
+        # A user always lands on the same worker, but the members of a group are
+        # spread over all of them, so each worker enforces its share of the chat limit
+        rate, burst = get_chat_flood_limit()
+        workers = worker_count()
+        self.chat_limit = (rate / workers, max(burst / workers, 1))
+        idle_ttl = max(burst / rate for rate, burst in [*self.user_limits.values(), self.chat_limit])
+        self.users = BucketTable(max_entries, idle_ttl)
+        self.chats = BucketTable(max_entries, idle_ttl)
+        self.throttled = 0
+
+    def export(self) -> dict:
+        return {'users': self.users.export(), 'chats': self.chats.export()}
+
+    def restore(self, state: dict, age: float):
+        self.users.restore(state.get('users', []), age)
+        self.chats.restore(state.get('chats', []), age)
+
+    @staticmethod
+    def is_command(update: Update) -> bool:
+        """Only updates that reach a handler doing work are rate limited"""
+        if update.callback_query:
+            return True
+        message = update.effective_message
+        text = message.text if message else None
+        return bool(text) and (text.startswith('/') or is_valid_prefix(text))
+
+    def allow(self, user_id: int, chat_id: int = None):
+        """Take a token for the user and chat, returns the throttled FloodEntry or None"""
+        # Rank comes from the rank index, which never expires, users missing from it are free users
+        rank = user_cache.rank(user_id) or Rank.FREE_USER
+        limit = self.user_limits.get(rank)
+        if limit:
+            entry = self.users.get(user_id, limit)
+            if not entry.bucket.try_acquire():
+                return entry
+            entry.notified = False
+
+        if chat_id is not None and chat_id != user_id:
+            entry = self.chats.get(chat_id, self.chat_limit)
+            if not entry.bucket.try_acquire():
+                return entry
+            entry.notified = False
+        return None
+
+    async def check_update(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handler callback, stops processing of throttled updates"""
+        if not update.effective_user or not self.is_command(update):
+            return
+
+        chat_id = update.effective_chat.id if update.effective_chat else None
+        entry = self.allow(update.effective_user.id, chat_id)
+        if entry is None:
+            return
+
+        self.throttled += 1
+        if update.callback_query:
+            # Callback queries must always be answered
+            await update.callback_query.answer("⏳ Vas muy rápido, espera unos segundos")
+        elif not entry.notified and update.effective_message:
+            await update.effective_message.reply_text("⏳ *Vas muy rápido, espera unos segundos*", parse_mode='Markdown')
+        entry.notified = True
+        raise ApplicationHandlerStop
+
+# Each bot has its own limits, Telegram rate limits are per bot token
+flood_control = TenantLocal(lambda tenant: FloodControl(max_entries=int(os.getenv('FLOOD_MAX_ENTRIES', '50000'))))
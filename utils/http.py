@@ -0,0 +1,164 @@
+import asyncio
+import logging
+import os
+import time
+import weakref
+import httpx
+from telegram.error import TimedOut
+from telegram.request import HTTPXRequest
+from utils.metrics import metrics
+from utils.runtime import runtime
+
+logger = logging.getLogger('RiasBot')
+
+class FastJSONRequest(HTTPXRequest):
+    """HTTPXRequest decoding Bot API responses with the JSON codec of the runtime profile"""
+
+    @staticmethod
+    def parse_json_payload(payload: bytes):
+        if runtime.json == 'json':
+            return HTTPXRequest.parse_json_payload(payload)
+        try:
+            return runtime.loads(payload)
+        except ValueError:
+            # Invalid UTF-8 or JSON, the stdlib path replaces bad bytes and logs the payload
+            return HTTPXRequest.parse_json_payload(payload)
+
+class SharedRequest(FastJSONRequest):
+    """HTTPXRequest used by every bot in the process
+
+    Each Application initializes and shuts down the request of its Bot, the
+    connection pool is only opened by the first one and closed by the last one.
+    The ErrorLogger takes a reference of its own before its first send, so the
+    pool stays open for late error reports after the last Application stopped,
+    and releases it in ErrorLogger.close() on shutdown.
+    The ErrorLogger bot and background senders use the same pool, so concurrent
+    sends reuse warm keep-alive connections instead of queueing behind a small
+    default pool. Calls beyond the pool size wait here for a free slot: the
+    httpx pool scans every connection for every waiting request, which costs
+    far more than the requests themselves once hundreds are queued in it.
+    Every call is counted in the metrics, with the time spent, the calls that
+    had to wait for a free connection and the connections opened.
+    """
+
+    def __init__(self, connection_pool_size: int = 32, keepalive_expiry: float = 30,
+                 pool_timeout: float = 5, **kwargs):
+        # HTTPXRequest keeps idle connections for 5 seconds, far less than the gap between bursts
+        self._limits = httpx.Limits(
+            max_connections=connection_pool_size,
+            max_keepalive_connections=connection_pool_size,
+            keepalive_expiry=keepalive_expiry
+        )
+        super().__init__(connection_pool_size=connection_pool_size, pool_timeout=pool_timeout, **kwargs)
+        self.connection_pool_size = connection_pool_size
+        self.pool_timeout = pool_timeout
+        self._slots = asyncio.Semaphore(connection_pool_size)
+        self._users = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        # Connections already counted as opened
+        self._seen_connections = weakref.WeakSet()
+
+    def _build_client(self) -> httpx.AsyncClient:
+        # Used by the base class both on creation and when reopened after a shutdown
+        self._client_kwargs['limits'] = self._limits
+        return super()._build_client()
+
+    async def initialize(self):
+        self._users += 1
+        if self._users == 1:
+            await super().initialize()
+
+    async def shutdown(self):
+        self._users = max(self._users - 1, 0)
+        if self._users == 0:
+            await super().shutdown()
+
+    def _connections(self) -> list:
+        """Connections of the httpx pool, empty if its internals are not available"""
+        pool = getattr(getattr(self._client, '_transport', None), '_pool', None)
+        return list(getattr(pool, 'connections', ()))
+
+    def _count_new_connections(self):
+        for connection in self._connections():
+            if connection not in self._seen_connections:
+                self._seen_connections.add(connection)
+                metrics.inc('http_connections_opened_total')
+
+    def stats(self) -> dict:
+        """Current state of the connection pool"""
+        connections = self._connections()
+        idle = sum(1 for connection in connections if connection.is_idle())
+        return {
+            'in_flight': self.in_flight,
+            'max_in_flight': self.max_in_flight,
+            'connections_open': len(connections),
+            'connections_idle': idle,
+        }
+
+    async def do_request(self, url: str, method: str, *args, **kwargs):
+        # The last part of the URL is the Bot API method, e.g. sendMessage
+        endpoint = url.rsplit('/', 1)[-1]
+        started = time.monotonic()
+        if self._slots.locked():
+            # Every connection is busy, this call waits for one to be released
+            metrics.inc('http_requests_queued_total')
+            try:
+                await asyncio.wait_for(self._slots.acquire(), self.pool_timeout)
+            except asyncio.TimeoutError:
+                metrics.inc('http_pool_timeouts_total')
+                raise TimedOut("Pool timeout: all connections of the shared pool are busy")
+        else:
+            await self._slots.acquire()
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            return await super().do_request(url, method, *args, **kwargs)
+        except TimedOut as e:
+            if 'Pool timeout' in str(e):
+                metrics.inc('http_pool_timeouts_total')
+            metrics.inc('http_errors_total', method=endpoint)
+            raise
+        except Exception:
+            metrics.inc('http_errors_total', method=endpoint)
+            raise
+        finally:
+            self._slots.release()
+            self.in_flight -= 1
+            metrics.inc('http_requests_total', method=endpoint)
+            metrics.observe('http_request_seconds', time.monotonic() - started, method=endpoint)
+            self._count_new_connections()
+
+def create_shared_request() -> SharedRequest:
+    """Build the shared transport from the HTTP_* environment variables"""
+    settings = dict(
+        connection_pool_size=int(os.getenv('HTTP_POOL_SIZE', '32')),
+        keepalive_expiry=float(os.getenv('HTTP_KEEPALIVE_EXPIRY', '30')),
+        connect_timeout=float(os.getenv('HTTP_CONNECT_TIMEOUT', '5')),
+        read_timeout=float(os.getenv('HTTP_READ_TIMEOUT', '5')),
+        write_timeout=float(os.getenv('HTTP_WRITE_TIMEOUT', '5')),
+        # Time a call may wait for a free connection
+        pool_timeout=float(os.getenv('HTTP_POOL_TIMEOUT', '5')),
+    )
+    http_version = os.getenv('HTTP_VERSION', '1.1')
+    try:
+        return SharedRequest(http_version=http_version, **settings)
+    except RuntimeError as e:
+        # HTTP/2 needs python-telegram-bot[http2]
+        logger.warning(f"HTTP/{http_version} not available, using HTTP/1.1: {e}")
+        return SharedRequest(**settings)
+
+def create_updates_request() -> FastJSONRequest:
+    """Request of the getUpdates long poll of one bot, as PTB builds it by default"""
+    return FastJSONRequest(connection_pool_size=1)
+
+def bot_api_urls() -> dict:
+    """Bot arguments pointing to BOT_API_URL, a self-hosted Bot API server, when set"""
+    url = os.getenv('BOT_API_URL', '').rstrip('/')
+    if not url:
+        return {}
+    return {'base_url': f"{url}/bot", 'base_file_url': f"{url}/file/bot"}
+
+# Bot API calls of all bots, the error logger and background senders go through
+# one connection pool, getUpdates keeps a request per bot since it is a long poll
+shared_request = create_shared_request()
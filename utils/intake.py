@@ -0,0 +1,233 @@
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict, deque
+from telegram import Update
+from config.intake import PRIORITY_NAMES, RANK_PRIORITIES, LOW_PRIORITY_COMMANDS, BUSY_REPLY_COMMANDS
+from database.cache import user_cache
+from database.models import OWNER_ID, Rank
+from database.tenant import TenantLocal
+from utils.metrics import metrics
+from utils.ratelimit import TokenBucket
+from utils.watchdog import describe_update, loop_watchdog, LoopWatchdog, TrackingUpdateProcessor
+
+logger = logging.getLogger('RiasBot')
+
+LOWEST_PRIORITY = len(PRIORITY_NAMES) - 1
+
+def update_priority(update, name: str) -> int:
+    """Priority class of an update from the known rank of its sender and what it runs"""
+    user = update.effective_user if isinstance(update, Update) else None
+    if user is None:
+        return LOWEST_PRIORITY
+    # Issei always goes first, even before his rank is loaded
+    if user.id == OWNER_ID:
+        return 0
+    if name in ('message', 'other'):
+        # Only the activity tracker looks at messages without a command
+        return LOWEST_PRIORITY
+    # The rank index never expires, staff idle for a while keep their priority.
+    # Users missing from it are free users, every other rank is loaded at start
+    rank = user_cache.rank(user.id) or Rank.FREE_USER
+    if rank == Rank.FREE_USER and name in LOW_PRIORITY_COMMANDS:
+        return LOWEST_PRIORITY
+    return RANK_PRIORITIES.get(rank, RANK_PRIORITIES[Rank.FREE_USER])
+
+def update_key(update):
+    """Updates with the same key run in arrival order, one at a time"""
+    if isinstance(update, Update):
+        if update.effective_user:
+            return update.effective_user.id
+        if update.effective_chat:
+            return update.effective_chat.id
+    return None
+
+class IntakeEntry:
+    """One update waiting in the intake"""
+    __slots__ = ('key', 'priority', 'future', 'ready')
+
+    def __init__(self, key, priority: int, future):
+        self.key = key
+        self.priority = priority
+        self.future = future
+        # Only the oldest entry of each user can be picked to run
+        self.ready = False
+
+class IntakeProcessor(TrackingUpdateProcessor):
+    """Bounded priority queue between the update fetcher and the handlers
+
+    PTB hands every update over as soon as it arrives. At most `workers` run at
+    a time and up to `queue_size` wait. The updates of one user wait in their
+    own FIFO and run one at a time, so they are never reordered; the oldest of
+    each user waits in the queue of its priority class and the classes are
+    served in order. When the queue is full the oldest update of the lowest
+    class waiting is shed, or the new one if its class is lower still. A shed
+    /start or button press gets a short busy answer, at most `busy_reply_rate`
+    per second.
+    """
+
+    def __init__(self, watchdog: LoopWatchdog, workers: int = 1, queue_size: int = 1000, busy_reply_rate: float = 5):
+        # PTB's semaphore only has to let every waiting update in, the queue below is the real bound
+        super().__init__(watchdog, max_concurrent_updates=workers + queue_size + 1)
+        self.workers = workers
+        self.queue_size = queue_size
+        self.running = 0
+        # key -> FIFO of the waiting entries of one user, and the keys running now
+        self._pending = {}
+        self._active = set()
+        # Per priority class: every waiting entry in arrival order, to pick what to shed,
+        # and the oldest entry of each user with nothing running, to pick what to run
+        self._waiting = [OrderedDict() for _ in PRIORITY_NAMES]
+        self._ready = [deque() for _ in PRIORITY_NAMES]
+        self._queued = 0
+        self.shed = 0
+        self._shedding = False
+        self.busy_replies = TokenBucket(busy_reply_rate, max(busy_reply_rate, 1))
+        self._replies = set()
+
+    def __len__(self):
+        return self._queued
+
+    async def do_process_update(self, update, coroutine):
+        name = describe_update(update)
+        priority = update_priority(update, name)
+        # Updates without user or chat have nothing to keep in order with
+        key = update_key(update)
+        entry = IntakeEntry(object() if key is None else key, priority, asyncio.get_running_loop().create_future())
+        if not await self._wait(entry):
+            # Never awaited, close it so Python does not warn about it
+            coroutine.close()
+            self._shed(update, priority, name)
+            return
+        try:
+            await super().do_process_update(update, coroutine)
+        finally:
+            self._finish(entry.key)
+
+    async def _wait(self, entry: IntakeEntry) -> bool:
+        """Queue the entry until a worker runs it, False if it was shed"""
+        if self._queued >= self.queue_size:
+            lowest = max((index for index, waiting in enumerate(self._waiting) if waiting), default=-1)
+            if entry.priority > lowest:
+                return False
+            # The update replaced is told by its future and sheds itself
+            victim = next(iter(self._waiting[lowest]))
+            self._remove(victim)
+            if not victim.future.done():
+                victim.future.set_result(False)
+
+        self._pending.setdefault(entry.key, deque()).append(entry)
+        self._waiting[entry.priority][entry] = None
+        self._queued += 1
+        self._promote(entry.key)
+        self._dispatch()
+
+        queued_at = time.monotonic()
+        try:
+            admitted = await entry.future
+        except asyncio.CancelledError:
+            if entry.future.cancelled():
+                self._remove(entry)
+                self._dispatch()
+            elif entry.future.result():
+                # The worker was already handed over, pass it on
+                self._finish(entry.key)
+            raise
+        if admitted:
+            metrics.observe('intake_wait_seconds', time.monotonic() - queued_at, priority=PRIORITY_NAMES[entry.priority])
+        return admitted
+
+    def _promote(self, key):
+        """Let the oldest entry of a user compete for a worker when none of its updates runs"""
+        pending = self._pending.get(key)
+        if key in self._active or not pending or pending[0].ready:
+            return
+        head = pending[0]
+        head.ready = True
+        self._ready[head.priority].append(head)
+
+    def _remove(self, entry: IntakeEntry):
+        """Take a waiting entry out of the queue"""
+        if entry.ready:
+            entry.ready = False
+            # Usually the oldest of its class, found right away
+            self._ready[entry.priority].remove(entry)
+        self._waiting[entry.priority].pop(entry, None)
+        pending = self._pending.get(entry.key)
+        if pending and entry in pending:
+            pending.remove(entry)
+            self._queued -= 1
+            if pending:
+                self._promote(entry.key)
+            else:
+                del self._pending[entry.key]
+
+    def _next(self):
+        """Best entry that can run, skipping cancelled ones"""
+        for ready in self._ready:
+            while ready:
+                entry = ready.popleft()
+                entry.ready = False
+                if not entry.future.done():
+                    return entry
+        return None
+
+    def _dispatch(self):
+        """Hand free workers to the best entries that can run"""
+        while self.running < self.workers:
+            entry = self._next()
+            if entry is None:
+                return
+            # Active first, so the next update of the same user is not promoted
+            self._active.add(entry.key)
+            self._remove(entry)
+            self.running += 1
+            entry.future.set_result(True)
+
+    def _finish(self, key):
+        self.running -= 1
+        self._active.discard(key)
+        self._promote(key)
+        self._dispatch()
+        if self._shedding and not self._queued:
+            self._shedding = False
+            logger.info(f"Intake queue drained, {self.shed} updates shed so far")
+
+    def _shed(self, update, priority: int, name: str):
+        self.shed += 1
+        metrics.inc('intake_shed_total', priority=PRIORITY_NAMES[priority])
+        if not self._shedding:
+            self._shedding = True
+            logger.warning(f"Intake queue full ({self.queue_size} waiting), shedding low priority updates")
+
+        callback_query = getattr(update, 'callback_query', None)
+        if not callback_query and name not in BUSY_REPLY_COMMANDS:
+            return
+        if not self.busy_replies.try_acquire():
+            return
+        task = asyncio.create_task(self._busy_reply(update))
+        self._replies.add(task)
+        task.add_done_callback(self._replies.discard)
+
+    @staticmethod
+    async def _busy_reply(update):
+        metrics.inc('intake_busy_replies_total')
+        try:
+            if update.callback_query:
+                # Callback queries must always be answered
+                await update.callback_query.answer("⏳ El bot está muy ocupado, intenta de nuevo en unos segundos")
+            elif update.effective_message:
+                await update.effective_message.reply_text(
+                    "⏳ *El bot está muy ocupado, intenta de nuevo en unos segundos*", parse_mode='Markdown'
+                )
+        except Exception as e:
+            logger.debug(f"Busy reply failed: {e}")
+
+# Each bot has its own queue, one bot's spike does not shed another's updates
+update_intake = TenantLocal(lambda tenant: IntakeProcessor(
+    loop_watchdog,
+    workers=int(os.getenv('INTAKE_WORKERS', '1')),
+    queue_size=int(os.getenv('INTAKE_QUEUE_SIZE', '1000')),
+    busy_reply_rate=float(os.getenv('INTAKE_BUSY_REPLY_RATE', '5'))
+))
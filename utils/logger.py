@@ -1,15 +1,23 @@
 import logging
 import os
+from logging.handlers import RotatingFileHandler
 import traceback
 from datetime import datetime
 from telegram import Bot
 import asyncio
 
 class ErrorLogger:
-    def __init__(self, bot_token=None, error_chat_id=None):
+    def __init__(self, bot_token=None, error_chat_id=None, request=None, **bot_kwargs):
         self.bot_token = bot_token
         self.error_chat_id = error_chat_id
         self.bot = None
+        self.request = request
+        # Whether this logger holds a reference of the shared request, taken on the first send
+        self._request_held = False
+        # Telegram sends in flight, referenced so they are not garbage collected mid-send
+        self._sends = set()
+        self.max_bytes = int(os.getenv('LOG_MAX_BYTES', str(5 * 1024 * 1024)))
+        self.backup_count = int(os.getenv('LOG_BACKUP_COUNT', '3'))
         
         # Create logs directory if it doesn't exist
         try:
@@ -23,7 +31,8 @@ class ErrorLogger:
         # Setup bot for Telegram notifications
         if bot_token:
             try:
-                self.bot = Bot(token=bot_token)
+                # Share the HTTP connection pool of the bots instead of opening another one
+                self.bot = Bot(token=bot_token, request=request, **bot_kwargs)
             except Exception as e:
                 print(f"Warning: Could not create bot instance: {e}")
     
@@ -33,8 +42,10 @@ class ErrorLogger:
         self.logger = logging.getLogger('RiasBot')
         self.logger.setLevel(logging.INFO)
         
-        # Clear any existing handlers
-        self.logger.handlers.clear()
+        # Clear any existing handlers, closing their files
+        for handler in list(self.logger.handlers):
+            self.logger.removeHandler(handler)
+            handler.close()
         
         # Create console handler (always works)
         console_handler = logging.StreamHandler()
@@ -48,7 +59,9 @@ class ErrorLogger:
             os.makedirs('logs', exist_ok=True)
             
             # Create file handler for logs directory
-            file_handler = logging.FileHandler('logs/bot_errors.log', encoding='utf-8')
+            # Rotated so a long running bot does not fill the disk
+            file_handler = RotatingFileHandler('logs/bot_errors.log', maxBytes=self.max_bytes,
+                                               backupCount=self.backup_count, encoding='utf-8')
             file_handler.setFormatter(log_format)
             self.logger.addHandler(file_handler)
         except Exception as e:
@@ -56,7 +69,8 @@ class ErrorLogger:
         
         try:
             # Create git log handler
-            git_log_handler = logging.FileHandler('error_log.txt', encoding='utf-8')
+            git_log_handler = RotatingFileHandler('error_log.txt', maxBytes=self.max_bytes,
+                                                  backupCount=self.backup_count, encoding='utf-8')
             git_log_handler.setFormatter(log_format)
             self.logger.addHandler(git_log_handler)
         except Exception as e:
@@ -84,9 +98,9 @@ class ErrorLogger:
                     chunks = [error_message[i:i+4000] for i in range(0, len(error_message), 4000)]
                     for i, chunk in enumerate(chunks):
                         chunk_message = f"🚨 ERROR PART {i+1}/{len(chunks)}\n\n{chunk}"
-                        asyncio.create_task(self.send_telegram_message(chunk_message))
+                        self.notify(chunk_message)
                 else:
-                    asyncio.create_task(self.send_telegram_message(error_message))
+                    self.notify(error_message)
             except Exception as e:
                 self.logger.error(f"Failed to send error to Telegram: {e}")
     
@@ -98,9 +112,20 @@ class ErrorLogger:
         """Log warning message"""
         self.logger.warning(message)
     
+    def notify(self, message):
+        """Send a message to the error chat in the background"""
+        task = asyncio.create_task(self.send_telegram_message(message))
+        self._sends.add(task)
+        task.add_done_callback(self._sends.discard)
+        return task
+    
     async def send_telegram_message(self, message):
         """Send message to Telegram error channel"""
         try:
+            if self.request and not self._request_held:
+                # Counted like one more bot, so the last Application shutting down does not close it
+                self._request_held = True
+                await self.request.initialize()
             await self.bot.send_message(
                 chat_id=self.error_chat_id,
                 text=message,
@@ -109,6 +134,14 @@ class ErrorLogger:
         except Exception as e:
             self.logger.error(f"Failed to send Telegram message: {e}")
     
+    async def close(self):
+        """Wait for the sends in flight and release the shared request, on shutdown"""
+        if self._sends:
+            await asyncio.gather(*self._sends, return_exceptions=True)
+        if self._request_held:
+            self._request_held = False
+            await self.request.shutdown()
+    
     def get_recent_errors(self, lines=50):
         """Get recent errors from log file"""
         try:
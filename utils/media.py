@@ -0,0 +1,37 @@
+import os
+from database.tenant import TenantLocal
+
+class MediaCache:
+    """Telegram file_ids of media already uploaded, keyed by source URL
+
+    Sending a file_id skips the download Telegram does for every URL send.
+    """
+
+    def __init__(self, max_size: int = 1000):
+        self.max_size = max_size
+        self._file_ids = {}
+
+    def get(self, url: str) -> str:
+        """Return the file_id for url, or url itself if it was never sent"""
+        return self._file_ids.get(url, url)
+
+    def remember(self, url: str, file_id: str):
+        if url in self._file_ids or len(self._file_ids) < self.max_size:
+            self._file_ids[url] = file_id
+
+    def forget(self, url: str):
+        """Drop a file_id Telegram no longer accepts"""
+        self._file_ids.pop(url, None)
+
+    def items(self):
+        return self._file_ids.items()
+
+    def load(self, file_ids: dict):
+        for url, file_id in file_ids.items():
+            self.remember(url, file_id)
+
+    def __len__(self):
+        return len(self._file_ids)
+
+# file_ids are only valid for the bot that uploaded the file
+media_cache = TenantLocal(lambda tenant: MediaCache(max_size=int(os.getenv('MEDIA_CACHE_SIZE', '1000'))))
@@ -0,0 +1,207 @@
+import asyncio
+import logging
+import os
+import resource
+import sys
+import time
+import tracemalloc
+from utils.metrics import metrics
+
+logger = logging.getLogger('RiasBot')
+
+def current_rss() -> int:
+    """Resident set size of the process in bytes"""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        # No /proc (macOS), the peak is the best available figure
+        return peak_rss()
+
+def peak_rss() -> int:
+    """Highest resident set size of the process in bytes"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+def format_bytes(size: float) -> str:
+    for unit in ('B', 'KB', 'MB'):
+        if abs(size) < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+class MemoryWatchdog:
+    """Records memory use and finds where it grows
+
+    Every `interval` seconds the RSS and the number of entries of each tracked
+    structure go to the metrics. When the RSS grew more than `growth_threshold`
+    bytes since the last alert (or start), on_alert(text) is called with the
+    structures that grew and, if tracemalloc is tracing, the allocation sites
+    that grew. Tracing is off unless started, it slows allocations down.
+    Snapshots stall the event loop while they are taken, so they keep only
+    `trace_frames` frames per allocation and are at least
+    `min_snapshot_interval` seconds apart.
+    """
+
+    def __init__(self, interval: float = 60, growth_threshold: int = 200 * 1024 * 1024,
+                 trace_frames: int = 5, top: int = 15, min_snapshot_interval: float = 60):
+        self.interval = interval
+        self.growth_threshold = growth_threshold
+        self.trace_frames = trace_frames
+        self.top = top
+        self.min_snapshot_interval = min_snapshot_interval
+        # name -> callable returning the number of entries
+        self._structures = {}
+        self.on_alert = None
+        self.baseline_rss = None
+        self._baseline_sizes = {}
+        # Snapshot the next /memsnap is compared with
+        self._snapshot = None
+        self._snapshot_at = None
+        self._task = None
+
+    def track(self, name: str, func):
+        """Record the size of a structure, func returns its number of entries"""
+        self._structures[name] = func
+
+    def sizes(self) -> dict:
+        sizes = {}
+        for name, func in self._structures.items():
+            try:
+                sizes[name] = func()
+            except Exception as e:
+                logger.warning(f"Memory size of {name} failed: {e}")
+        return sizes
+
+    def start(self, on_alert=None, trace: bool = False):
+        self.on_alert = on_alert
+        if trace:
+            self.start_tracing()
+        self.baseline_rss = current_rss()
+        self._baseline_sizes = self.sizes()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.check()
+            except Exception as e:
+                logger.warning(f"Memory check failed: {e}")
+
+    async def check(self):
+        """Record the current figures and alert on growth"""
+        rss = current_rss()
+        sizes = self.sizes()
+        metrics.set('process_rss_bytes', rss)
+        metrics.set('process_rss_peak_bytes', peak_rss())
+        for name, size in sizes.items():
+            metrics.set('memory_structure_entries', size, structure=name)
+        if tracemalloc.is_tracing():
+            metrics.set('tracemalloc_traced_bytes', tracemalloc.get_traced_memory()[0])
+
+        growth = rss - self.baseline_rss
+        if growth < self.growth_threshold:
+            return
+        metrics.inc('memory_alerts_total')
+        lines = [f"RSS grew {format_bytes(growth)} to {format_bytes(rss)}"]
+        for name, size in sorted(sizes.items(), key=lambda item: item[1] - self._baseline_sizes.get(item[0], 0), reverse=True):
+            delta = size - self._baseline_sizes.get(name, 0)
+            if delta > 0:
+                lines.append(f"  {name}: +{delta} entries ({size})")
+        if tracemalloc.is_tracing() and not self.snapshot_wait():
+            lines.append("")
+            lines.append(await self.diff())
+        text = "\n".join(lines)
+        logger.warning(f"Memory growth\n{text}")
+        # The next alert needs the same growth again
+        self.baseline_rss = rss
+        self._baseline_sizes = sizes
+        if self.on_alert:
+            try:
+                self.on_alert(text)
+            except Exception as e:
+                logger.error(f"Memory alert failed: {e}")
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start_tracing(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.trace_frames)
+        self._snapshot = None
+
+    def stop_tracing(self):
+        tracemalloc.stop()
+        self._snapshot = None
+
+    def _compare(self, previous, current) -> str:
+        if previous is None:
+            stats = current.statistics('lineno')
+            title = "Largest allocation sites"
+        else:
+            stats = current.compare_to(previous, 'lineno')
+            title = "Allocation sites that grew the most"
+        # Allocations of tracemalloc itself are noise
+        stats = [stat for stat in stats if stat.traceback[0].filename != tracemalloc.__file__][:self.top]
+        if previous is None:
+            lines = [f"{format_bytes(stat.size):>10} {stat.count:>8} blocks  {stat.traceback[0]}" for stat in stats]
+        else:
+            lines = [
+                f"{format_bytes(stat.size_diff):>10} {stat.count_diff:>+8} blocks  {stat.traceback[0]}"
+                for stat in stats
+            ]
+
+        # Full stack of the top site, to see who calls it
+        if stats:
+            site = stats[0].traceback[0]
+            for stack in current.statistics('traceback'):
+                # Frames go from the oldest to the one that allocated
+                if stack.traceback[-1] == site:
+                    lines.append("")
+                    lines.append(f"Stack of {site}:")
+                    lines.extend(f"  {line}" for line in stack.traceback.format())
+                    break
+        return f"{title}:\n" + "\n".join(lines)
+
+    def snapshot_wait(self) -> float:
+        """Seconds until the next snapshot may be taken, 0 if it can be taken now"""
+        if self._snapshot_at is None:
+            return 0
+        return max(self._snapshot_at + self.min_snapshot_interval - time.monotonic(), 0)
+
+    async def diff(self) -> str:
+        """Compare a new tracemalloc snapshot with the previous one"""
+        # take_snapshot copies every traced block in C holding the GIL, a thread would not
+        # let the loop run meanwhile. The stall grows with the blocks traced and their
+        # frames, which is why both the frames and the snapshot rate are limited
+        current = tracemalloc.take_snapshot()
+        self._snapshot_at = time.monotonic()
+        previous, self._snapshot = self._snapshot, current
+        # Comparing is Python code, in a thread it gives the GIL back to the loop regularly
+        return await asyncio.to_thread(self._compare, previous, current)
+
+    def status(self) -> str:
+        lines = [f"RSS: {format_bytes(current_rss())} (peak {format_bytes(peak_rss())})"]
+        if tracemalloc.is_tracing():
+            traced, peak = tracemalloc.get_traced_memory()
+            lines.append(f"tracemalloc: {format_bytes(traced)} traced (peak {format_bytes(peak)})")
+        else:
+            lines.append("tracemalloc: off")
+        lines.extend(f"{name}: {size}" for name, size in sorted(self.sizes().items()))
+        return "\n".join(lines)
+
+memory_watchdog = MemoryWatchdog(
+    interval=float(os.getenv('MEMORY_CHECK_INTERVAL', '60')),
+    growth_threshold=int(os.getenv('MEMORY_ALERT_GROWTH_MB', '200')) * 1024 * 1024,
+    trace_frames=int(os.getenv('MEMORY_TRACE_FRAMES', '5')),
+    min_snapshot_interval=float(os.getenv('MEMORY_SNAPSHOT_INTERVAL', '60'))
+)
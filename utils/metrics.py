@@ -0,0 +1,122 @@
+import asyncio
+import logging
+import threading
+
+logger = logging.getLogger('RiasBot')
+
+class Metrics:
+    """In-process counters, gauges and summaries rendered in Prometheus text format"""
+
+    def __init__(self):
+        # (name, labels) -> value, labels is a sorted tuple of (key, value)
+        self._counters = {}
+        self._gauges = {}
+        # (name, labels) -> [count, sum, max]
+        self._summaries = {}
+        # name -> callable returning the current value
+        self._callbacks = {}
+        # Summaries may be observed from the watchdog thread
+        self._lock = threading.Lock()
+        self._server = None
+
+    @staticmethod
+    def _key(name: str, labels: dict):
+        return name, tuple(sorted(labels.items()))
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels):
+        self._gauges[self._key(name, labels)] = value
+
+    def observe(self, name: str, value: float, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            summary = self._summaries.get(key)
+            if summary is None:
+                self._summaries[key] = [1, value, value]
+            else:
+                summary[0] += 1
+                summary[1] += value
+                summary[2] = max(summary[2], value)
+
+    def gauge_callback(self, name: str, func):
+        """Register a gauge read when the metrics are rendered"""
+        self._callbacks[name] = func
+
+    @staticmethod
+    def _format(name: str, labels: tuple, value) -> str:
+        if labels:
+            label_text = ",".join(f'{key}="{value}"' for key, value in labels)
+            return f"{name}{{{label_text}}} {value}"
+        return f"{name} {value}"
+
+    def render(self) -> str:
+        """All metrics in Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            summaries = sorted((key, list(value)) for key, value in self._summaries.items())
+        gauges = sorted(self._gauges.items())
+
+        typed = set()
+        for (name, labels), value in counters:
+            if name not in typed:
+                lines.append(f"# TYPE {name} counter")
+                typed.add(name)
+            lines.append(self._format(name, labels, value))
+        for (name, labels), value in gauges:
+            if name not in typed:
+                lines.append(f"# TYPE {name} gauge")
+                typed.add(name)
+            lines.append(self._format(name, labels, value))
+        for name, func in sorted(self._callbacks.items()):
+            try:
+                value = func()
+            except Exception as e:
+                logger.warning(f"Metric {name} failed: {e}")
+                continue
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(self._format(name, (), value))
+        for (name, labels), (count, total, maximum) in summaries:
+            if name not in typed:
+                lines.append(f"# TYPE {name} summary")
+                typed.add(name)
+            lines.append(self._format(f"{name}_count", labels, count))
+            lines.append(self._format(f"{name}_sum", labels, round(total, 6)))
+            lines.append(self._format(f"{name}_max", labels, round(maximum, 6)))
+        return "\n".join(lines) + "\n"
+
+    async def serve(self, port: int, host: str = '0.0.0.0'):
+        """Expose the metrics over HTTP for a Prometheus scraper"""
+        self._server = await asyncio.start_server(self._handle_http, host, port)
+        logger.info(f"Metrics available on http://{host}:{port}/metrics")
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle_http(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            # Any path returns the metrics, the request itself is not needed
+            await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), timeout=5)
+            body = self.render().encode()
+            writer.write(
+                b"HTTP/1.1 200 OK\r\n"
+                b"Content-Type: text/plain; version=0.0.4\r\n"
+                + f"Content-Length: {len(body)}\r\n".encode()
+                + b"Connection: close\r\n\r\n"
+                + body
+            )
+            await writer.drain()
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+# Shared by every module of the process
+metrics = Metrics()
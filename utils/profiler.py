@@ -0,0 +1,130 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from utils.watchdog import TrackingUpdateProcessor
+
+# Frame of the update processor, its `name` local is the handler being run
+_PROCESS_UPDATE_CODE = TrackingUpdateProcessor.do_process_update.__code__
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+class ProfileResult:
+    """Stacks sampled from the event loop thread, grouped by handler"""
+
+    def __init__(self, samples: Counter, seconds: float, interval: float):
+        # (handler, stack from outermost to innermost frame) -> number of samples
+        self.samples = samples
+        self.seconds = seconds
+        self.interval = interval
+
+    @property
+    def total(self) -> int:
+        return sum(self.samples.values())
+
+    def collapsed(self) -> str:
+        """One `handler;frame;...;frame count` line per stack, the input of flamegraph.pl and speedscope"""
+        return "".join(
+            f"{';'.join((handler,) + stack)} {count}\n"
+            for (handler, stack), count in sorted(self.samples.items())
+        )
+
+    def summary(self, top: int = 10) -> str:
+        """Busiest handlers and, for each one, the functions with most samples"""
+        by_handler = Counter()
+        own = defaultdict(Counter)
+        inclusive = defaultdict(Counter)
+        for (handler, stack), count in self.samples.items():
+            by_handler[handler] += count
+            if stack:
+                own[handler][stack[-1]] += count
+            # A recursive function counts once per sample
+            for frame in set(stack):
+                inclusive[handler][frame] += count
+
+        total = self.total or 1
+        lines = [f"{self.total} samples in {self.seconds:.0f}s, one every {self.interval * 1000:.0f}ms", ""]
+        for handler, count in by_handler.most_common():
+            lines.append(f"== {handler}: {count} samples ({count * 100 / total:.1f}%)")
+            lines.append("  self")
+            for frame, frame_count in own[handler].most_common(top):
+                lines.append(f"    {frame_count * 100 / total:5.1f}%  {frame}")
+            lines.append("  total")
+            for frame, frame_count in inclusive[handler].most_common(top):
+                lines.append(f"    {frame_count * 100 / total:5.1f}%  {frame}")
+            lines.append("")
+        return "\n".join(lines)
+
+class SamplingProfiler:
+    """Statistical profiler of the event loop thread for the live bot
+
+    A thread wakes up every `interval` seconds and records the stack of the loop
+    thread, tagged with the handler whose update is being processed, or `idle`
+    when the loop is waiting for I/O. Nothing is traced between samples, so the
+    cost is one stack walk per interval.
+    """
+
+    def __init__(self, interval: float = 0.01, max_stack: int = 64):
+        self.interval = interval
+        self.max_stack = max_stack
+        self.task = None
+        self._labels = {}
+
+    @property
+    def running(self) -> bool:
+        return self.task is not None and not self.task.done()
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            path = code.co_filename
+            if path.startswith(_ROOT):
+                path = os.path.relpath(path, _ROOT)
+            else:
+                path = "/".join(path.replace("\\", "/").split("/")[-2:])
+            label = self._labels[code] = f"{code.co_name} ({path}:{code.co_firstlineno})"
+        return label
+
+    def _sample(self, thread_id: int, samples: Counter, stopping: threading.Event):
+        """Runs in the sampling thread"""
+        while not stopping.wait(self.interval):
+            frame = sys._current_frames().get(thread_id)
+            if frame is None:
+                continue
+            handler = 'idle'
+            stack = []
+            while frame is not None and len(stack) < self.max_stack:
+                code = frame.f_code
+                if code is _PROCESS_UPDATE_CODE:
+                    handler = frame.f_locals.get('name') or 'other'
+                stack.append(self._label(code))
+                frame = frame.f_back
+            stack.reverse()
+            samples[(handler, tuple(stack))] += 1
+
+    async def profile(self, seconds: float) -> ProfileResult:
+        """Sample the thread running the event loop for `seconds` seconds"""
+        samples = Counter()
+        stopping = threading.Event()
+        thread = threading.Thread(
+            target=self._sample, args=(threading.get_ident(), samples, stopping),
+            name='profiler', daemon=True
+        )
+        started = time.monotonic()
+        thread.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            stopping.set()
+            await asyncio.to_thread(thread.join)
+        return ProfileResult(samples, time.monotonic() - started, self.interval)
+
+    def start(self, seconds: float, on_done):
+        """Profile in the background, on_done(result) is awaited at the end"""
+        async def run():
+            await on_done(await self.profile(seconds))
+        self.task = asyncio.create_task(run())
+        return self.task
+
+profiler = SamplingProfiler(interval=int(os.getenv('PROFILE_INTERVAL_MS', '10')) / 1000)
@@ -0,0 +1,78 @@
+import asyncio
+import json
+import logging
+import os
+
+logger = logging.getLogger('RiasBot')
+
+PROFILES = ('standard', 'performance')
+
+class RuntimeProfile:
+    """Event loop and JSON codec the process runs with
+
+    The standard profile is plain asyncio and the stdlib json module. The
+    performance profile installs uvloop and uses orjson for Bot API responses
+    and the frames between cluster processes, each only if the package is installed; a missing one is skipped
+    and the process runs with the standard implementation instead.
+    """
+
+    def __init__(self):
+        self.name = 'standard'
+        self.loop = 'asyncio'
+        self.json = 'json'
+        self._loads = None
+        self._dumps = None
+        self._applied = False
+
+    def apply(self, name: str = None) -> list:
+        """Install the accelerations of a profile, returns the ones now active
+
+        Must run before the event loop is created. Only the first call has an
+        effect, so every entry point can call it.
+        """
+        if self._applied:
+            return self.accelerations()
+        self._applied = True
+        self.name = (name or os.getenv('RUNTIME_PROFILE', 'standard')).lower()
+        if self.name not in PROFILES:
+            logger.warning(f"Unknown RUNTIME_PROFILE {self.name!r}, using standard")
+            self.name = 'standard'
+        if self.name != 'performance':
+            return []
+
+        try:
+            import uvloop
+            asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+            self.loop = 'uvloop'
+        except ImportError:
+            logger.warning("uvloop is not installed, using the asyncio event loop")
+
+        try:
+            import orjson
+            self._loads = orjson.loads
+            self._dumps = orjson.dumps
+            self.json = 'orjson'
+        except ImportError:
+            logger.warning("orjson is not installed, using the json module")
+
+        return self.accelerations()
+
+    def accelerations(self) -> list:
+        return [name for name in (self.loop, self.json) if name not in ('asyncio', 'json')]
+
+    def describe(self) -> str:
+        return f"{self.name} (loop: {self.loop}, json: {self.json})"
+
+    def loads(self, payload: bytes):
+        """Decode a JSON payload with the codec of the profile"""
+        if self._loads is None:
+            return json.loads(payload)
+        return self._loads(payload)
+
+    def dumps(self, value) -> bytes:
+        """Encode a value as compact JSON bytes with the codec of the profile"""
+        if self._dumps is None:
+            return json.dumps(value, separators=(',', ':')).encode()
+        return self._dumps(value)
+
+runtime = RuntimeProfile()
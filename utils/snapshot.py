@@ -0,0 +1,175 @@
+import asyncio
+import gzip
+import json
+import logging
+import os
+import time
+from datetime import datetime
+from telegram.ext import ApplicationHandlerStop
+from database.cache import user_cache
+from database.models import User
+from database.tenant import TenantLocal
+from utils.flood import flood_control
+from utils.media import media_cache
+
+logger = logging.getLogger('RiasBot')
+
+# Bump when the layout of the file changes, older files are ignored
+SNAPSHOT_VERSION = 1
+
+class WarmStart:
+    """Saves hot in-memory state on shutdown and restores it on the next start
+
+    The snapshot holds the cached users, the media file_ids, the flood control
+    buckets, the open connections per pool and the last processed update id. It
+    is a gzipped JSON file that is ignored when its version differs, it is
+    older than `max_age` seconds or it cannot be read whole. Restored users are served from the cache right
+    away and re-read from the database in the background.
+    """
+
+    def __init__(self, path: str = 'logs/warm_start.json.gz', max_age: float = 600,
+                 refresh_batch: int = 500):
+        self.path = path
+        self.max_age = max_age
+        self.refresh_batch = refresh_batch
+        self.last_update_id = 0
+        # Updates up to this id were processed before the restart
+        self.skip_until = 0
+        self.pool_sizes = {}
+        self._refresh_ids = []
+        self._task = None
+
+    async def track_update(self, update, context):
+        """Handler callback remembering the last update id and dropping replayed updates"""
+        if update.update_id <= self.skip_until:
+            raise ApplicationHandlerStop
+        self.last_update_id = max(self.last_update_id, update.update_id)
+
+    def save(self, db_manager):
+        """Write the snapshot, called once on graceful shutdown"""
+        users = []
+        for user in user_cache.users():
+            row = list(user.to_row())
+            row[6] = row[6].isoformat() if row[6] else None
+            row[7] = row[7].isoformat() if row[7] else None
+            users.append(row)
+        state = {
+            'version': SNAPSHOT_VERSION,
+            'saved_at': time.time(),
+            'last_update_id': max(self.last_update_id, self.skip_until),
+            'users': users,
+            'media': dict(media_cache.items()),
+            'flood': flood_control.export(),
+            'pools': db_manager.pool_sizes(),
+        }
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+                json.dump(state, f, separators=(',', ':'))
+            # Never leave a half written snapshot behind
+            os.replace(tmp_path, self.path)
+            logger.info(f"Saved warm start snapshot: {len(users)} users, {len(media_cache)} media")
+        except Exception as e:
+            logger.error(f"Could not save warm start snapshot: {e}")
+
+    def load(self):
+        """Restore the snapshot if it is present, current and recent"""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with gzip.open(self.path, 'rt', encoding='utf-8') as f:
+                state = json.load(f)
+        except Exception as e:
+            logger.error(f"Could not read warm start snapshot: {e}")
+            return
+        finally:
+            # A snapshot is used once, a crash later must not restore stale state
+            try:
+                os.remove(self.path)
+            except OSError as e:
+                logger.warning(f"Could not remove warm start snapshot: {e}")
+
+        try:
+            snapshot = self._parse(state)
+        except (AttributeError, KeyError, IndexError, TypeError, ValueError) as e:
+            # Checked before anything is restored, a bad file just means a cold start
+            logger.error(f"Ignoring corrupt warm start snapshot: {e!r}")
+            return
+        if snapshot is None:
+            return
+
+        users, age = snapshot['users'], snapshot['age']
+        for user in users:
+            user_cache.put(user)
+            self._refresh_ids.append(user.telegram_id)
+        media_cache.load(snapshot['media'])
+        flood_control.restore(snapshot['flood'], age)
+        self.skip_until = snapshot['last_update_id']
+        self.pool_sizes = snapshot['pools']
+        logger.info(f"Loaded warm start snapshot: {len(users)} users, {age:.0f}s old")
+
+    def _parse(self, state) -> dict:
+        """Validated contents of a snapshot, None if it is outdated"""
+        age = time.time() - float(state.get('saved_at', 0))
+        if state.get('version') != SNAPSHOT_VERSION or not 0 <= age <= self.max_age:
+            logger.info(f"Ignoring warm start snapshot (version {state.get('version')}, {age:.0f}s old)")
+            return None
+
+        users = []
+        for row in state['users']:
+            row[6] = datetime.fromisoformat(row[6]) if row[6] else None
+            row[7] = datetime.fromisoformat(row[7]) if row[7] else None
+            users.append(User.from_row(row))
+        flood = {
+            name: [[key, float(rate), float(burst), float(tokens)] for key, rate, burst, tokens in state['flood'][name]]
+            for name in ('users', 'chats')
+        }
+        return {
+            'age': age,
+            'users': users,
+            'media': {str(url): str(file_id) for url, file_id in state['media'].items()},
+            'flood': flood,
+            'last_update_id': int(state['last_update_id']),
+            'pools': {str(role): int(connections) for role, connections in state['pools'].items()},
+        }
+
+    def start(self, db_manager):
+        """Open the pool connections and refresh restored users in the background"""
+        self._task = asyncio.create_task(self._refresh(db_manager))
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _refresh(self, db_manager):
+        try:
+            for role, connections in self.pool_sizes.items():
+                await db_manager.warm_pool(role, connections)
+            # In cache order, so re-putting keeps the LRU order of the snapshot
+            ids, self._refresh_ids = self._refresh_ids, []
+            for i in range(0, len(ids), self.refresh_batch):
+                batch = ids[i:i + self.refresh_batch]
+                found = {user.telegram_id: user for user in await db_manager.fetch_users(batch)}
+                for telegram_id in batch:
+                    if telegram_id in found:
+                        user_cache.put(found[telegram_id])
+                    else:
+                        user_cache.invalidate(telegram_id, publish=False)
+                # Leave room for the queries of live traffic
+                await asyncio.sleep(0.1)
+        except Exception as e:
+            # Entries that were not refreshed simply expire with the cache TTL
+            logger.warning(f"Warm start refresh stopped: {e}")
+
+def _snapshot_path(tenant: str) -> str:
+    path = os.getenv('SNAPSHOT_PATH', 'logs/warm_start.json.gz')
+    return f"{path}.{tenant}" if tenant else path
+
+# One snapshot file per bot
+warm_start = TenantLocal(lambda tenant: WarmStart(
+    path=_snapshot_path(tenant),
+    max_age=float(os.getenv('SNAPSHOT_MAX_AGE', '600'))
+))
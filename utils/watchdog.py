@@ -0,0 +1,167 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from telegram.ext import SimpleUpdateProcessor
+from config.prefixes import is_valid_prefix, get_command_without_prefix
+from utils.metrics import metrics
+
+logger = logging.getLogger('RiasBot')
+
+def describe_update(update) -> str:
+    """Short name of what an update triggers, e.g. the command or callback prefix"""
+    if getattr(update, 'callback_query', None):
+        return f"callback:{(update.callback_query.data or '').split(':')[0]}"
+    message = getattr(update, 'effective_message', None)
+    text = message.text if message else None
+    if text:
+        if text.startswith('/'):
+            return text.split()[0][1:].split('@')[0].lower()
+        if is_valid_prefix(text):
+            parts = get_command_without_prefix(text).split()
+            if parts:
+                return parts[0].lower()
+    return 'message' if message else 'other'
+
+class StallEvent:
+    """One period during which the event loop did not run"""
+    __slots__ = ('duration', 'handlers', 'stack', 'at')
+
+    def __init__(self, duration: float, handlers: list, stack: str):
+        self.duration = duration
+        self.handlers = handlers
+        self.stack = stack
+        self.at = time.time()
+
+    def describe(self) -> str:
+        running = ", ".join(f"{name} (update {update_id})" for update_id, name in self.handlers) or "no handler"
+        return f"Event loop blocked for {self.duration:.3f}s in {running}"
+
+class LoopWatchdog:
+    """Measures event loop lag and captures the stack of whatever blocks it
+
+    A heartbeat task sleeps `interval` seconds and records how late it wakes up.
+    A sampling thread watches the heartbeat, when it is more than `threshold`
+    seconds old it captures the stack of the loop thread and the handlers in
+    progress, which is reported once the loop runs again.
+    """
+
+    def __init__(self, threshold: float = 0.25, interval: float = 0.05, report_interval: float = 60):
+        self.threshold = threshold
+        self.interval = interval
+        self.report_interval = report_interval
+        # update_id -> name of the handlers in progress
+        self.active = {}
+        self.events = deque(maxlen=20)
+        self.on_stall = None
+        # Handler names used as metric labels, capped so forged commands cannot add series
+        self._labels = set()
+        self.max_labels = 100
+        self._beat = time.monotonic()
+        self._captured = None
+        self._last_report = 0
+        self._loop_thread_id = None
+        self._task = None
+        self._thread = None
+        self._stopping = threading.Event()
+
+    def label(self, name: str) -> str:
+        if name not in self._labels:
+            if len(self._labels) >= self.max_labels:
+                return 'other'
+            self._labels.add(name)
+        return name
+
+    def enter(self, update_id: int, name: str):
+        self.active[update_id] = name
+
+    def leave(self, update_id: int):
+        self.active.pop(update_id, None)
+
+    def start(self, on_stall=None):
+        """Start watching the running loop, on_stall(event) is called at most once per report_interval"""
+        self.on_stall = on_stall
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stopping.clear()
+        self._task = asyncio.create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._sample, name='loop-watchdog', daemon=True)
+        self._thread.start()
+
+    async def stop(self):
+        self._stopping.set()
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._thread:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    async def _heartbeat(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._beat = now
+            lag = max(now - expected, 0)
+            metrics.observe('event_loop_lag_seconds', lag)
+            if lag >= self.threshold:
+                self._report(lag)
+            else:
+                # A stack caught in a shorter stall must not be blamed for the next one
+                self._captured = None
+
+    def _sample(self):
+        """Runs in the sampling thread"""
+        while not self._stopping.wait(self.interval):
+            # The beat is expected every interval, the loop is stalled past threshold beyond that
+            if self._captured is not None or time.monotonic() - self._beat < self.interval + self.threshold:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)[-12:]) if frame else ""
+            self._captured = (list(self.active.items()), stack)
+
+    def _report(self, lag: float):
+        handlers, stack = self._captured or (list(self.active.items()), "")
+        self._captured = None
+        event = StallEvent(lag, handlers, stack)
+        self.events.append(event)
+        for _, name in handlers or [(None, 'none')]:
+            metrics.inc('event_loop_stalls_total', handler=self.label(name))
+        logger.warning(f"{event.describe()}\n{stack}")
+
+        now = time.monotonic()
+        if self.on_stall and now - self._last_report >= self.report_interval:
+            self._last_report = now
+            try:
+                self.on_stall(event)
+            except Exception as e:
+                logger.error(f"Stall report failed: {e}")
+
+class TrackingUpdateProcessor(SimpleUpdateProcessor):
+    """Update processor telling the watchdog which update is being handled"""
+
+    def __init__(self, watchdog: LoopWatchdog, max_concurrent_updates: int = 1):
+        super().__init__(max_concurrent_updates)
+        self.watchdog = watchdog
+
+    async def do_process_update(self, update, coroutine):
+        update_id = getattr(update, 'update_id', None)
+        name = describe_update(update)
+        self.watchdog.enter(update_id, name)
+        started = time.monotonic()
+        try:
+            await coroutine
+        finally:
+            self.watchdog.leave(update_id)
+            metrics.observe('update_duration_seconds', time.monotonic() - started, handler=self.watchdog.label(name))
+
+loop_watchdog = LoopWatchdog(
+    threshold=int(os.getenv('LOOP_LAG_THRESHOLD_MS', '250')) / 1000,
+    interval=int(os.getenv('LOOP_WATCHDOG_INTERVAL_MS', '50')) / 1000
+)